@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    yield app
+
+
+@pytest.fixture
+def media(tmp_path):
+    def create(name: str, content: bytes = b'\x00' * 1024) -> str:
+        path = tmp_path / name
+        path.write_bytes(content)
+        return str(path)
+    return create
@@ -0,0 +1,80 @@
+import shutil
+import subprocess
+from array import array
+
+import pytest
+
+from vidcutter.libs.containerindex import ContainerIndex, MatroskaIndex, MP4Index
+
+ffmpeg = shutil.which('ffmpeg')
+needs_ffmpeg = pytest.mark.skipif(ffmpeg is None, reason='ffmpeg is required to generate test media')
+
+
+def encode(path, *args):
+    subprocess.check_call([ffmpeg, '-v', 'error', '-f', 'lavfi', '-i', 'testsrc2=size=160x120:rate=25', '-t', '10',
+                           '-c:v', 'libx264', '-g', '50', '-keyint_min', '50', '-sc_threshold', '0', '-bf', '2']
+                          + list(args) + ['-y', str(path)])
+    return str(path)
+
+
+def test_decode_times_across_stts_runs():
+    # 3 samples of 512 then 4 of 1024 ticks, sync samples are 1-based
+    stts = array('I', [3, 512, 4, 1024])
+    assert MP4Index.decodeTimes(stts, array('I', [1, 3, 4, 7])) == [0, 1024, 1536, 4608]
+    # sync samples past the table end clamp to the total duration
+    assert MP4Index.decodeTimes(stts, array('I', [9])) == [5632]
+
+
+def test_composition_offsets_follow_runs():
+    ctts = array('i', [1, 1024, 2, 0, 1, -512])
+    assert MP4Index.compositionOffsets(ctts, array('I', [1, 2, 4, 5])) == [1024, 0, -512, 0]
+
+
+def test_sparse_cues():
+    dense = [float(t) for t in range(0, 60, 2)]
+    assert not MatroskaIndex.sparse(dense, 60.0, 0.04)
+    # one cue every 20 s at 25 fps is far wider than a 250 frame GOP
+    assert MatroskaIndex.sparse([0.0, 20.0, 40.0], 60.0, 0.04)
+    # a single long hole or a long uncued tail is enough
+    assert MatroskaIndex.sparse(dense[:10] + [40.0], 42.0, 0.04)
+    assert MatroskaIndex.sparse(dense[:5], 60.0, 0.04)
+    # unknown frame rates assume 25 fps, high frame rates shrink the allowed spacing
+    assert not MatroskaIndex.sparse([0.0, 8.0, 16.0], 20.0, 0)
+    assert MatroskaIndex.sparse([0.0, 8.0, 16.0], 20.0, 1 / 60)
+
+
+@needs_ffmpeg
+def test_mp4_sync_samples_with_bframes(tmp_path):
+    # b-frames give the track a ctts box and an edit list trimming the composition delay
+    result = ContainerIndex.read(encode(tmp_path / 'gop.mp4'))
+    assert result is not None
+    strategy, times, positions = result
+    assert strategy == 'mp4 stss'
+    assert times == pytest.approx([0.0, 2.0, 4.0, 6.0, 8.0])
+    assert all(b > a > 0 for a, b in zip(positions, positions[1:]))
+
+
+@needs_ffmpeg
+def test_mp4_empty_edit_delays_keyframes(tmp_path):
+    _, times, _ = ContainerIndex.read(encode(tmp_path / 'delayed.mp4', '-output_ts_offset', '1.5'))
+    assert times == pytest.approx([1.5, 3.5, 5.5, 7.5, 9.5])
+
+
+@needs_ffmpeg
+def test_matroska_cues(tmp_path):
+    strategy, times, positions = ContainerIndex.read(encode(tmp_path / 'gop.mkv'))
+    assert strategy == 'matroska cues'
+    assert times == pytest.approx([0.0, 2.0, 4.0, 6.0, 8.0], abs=0.05)
+    assert all(b > a > 0 for a, b in zip(positions, positions[1:]))
+
+
+@needs_ffmpeg
+def test_sparse_matroska_cues_fall_back(tmp_path):
+    path = tmp_path / 'sparse.mkv'
+    subprocess.check_call([ffmpeg, '-v', 'error', '-f', 'lavfi', '-i', 'testsrc2=size=160x120:rate=25', '-t', '60',
+                           '-c:v', 'libx264', '-g', '1000', '-sc_threshold', '0', '-y', str(path)])
+    assert ContainerIndex.read(str(path)) is None
+
+
+def test_unknown_container(media):
+    assert ContainerIndex.read(media('clip.avi', b'RIFF' + b'\x00' * 64)) is None
@@ -0,0 +1,127 @@
+import time
+
+from vidcutter.libs.keyframes import KeyframeCache, KeyframeIndex, KeyframeParser
+
+
+def test_parser_reads_keyframes_across_chunks():
+    index = KeyframeIndex('clip.mp4', 10.0)
+    parser = KeyframeParser(index)
+    parser.feed(b'0.000000,48,K_\n0.040000,1200,__\n2.0')
+    parser.feed(b'00000,9000,K_\n2.040000,9800,__\n4.000000,N/A,K_')
+    assert list(index.times) == [0.0, 2.0]
+    assert index.scanned == 2.04
+    parser.close()
+    assert list(index.times) == [0.0, 2.0, 4.0, 10.0]
+    assert list(index.positions) == [48, 9000, -1, -1]
+    assert index.complete
+
+
+def test_parser_keeps_last_pts_for_unstamped_packets():
+    index = KeyframeIndex('clip.mp4', 10.0)
+    parser = KeyframeParser(index)
+    parser.feed(b'3.500000,10,__\nN/A,20,K_\ngarbage\n\n')
+    assert list(index.times) == [3.5]
+
+
+def test_out_of_order_keyframes_are_sorted():
+    index = KeyframeIndex('clip.mp4', 10.0)
+    for pts in (0.0, 4.0, 2.0, 4.0):
+        index.add(pts)
+    assert list(index.times) == [0.0, 2.0, 4.0]
+
+
+def test_covers_needs_two_keyframes_past_the_end():
+    index = KeyframeIndex('clip.mp4', 10.0)
+    parser = KeyframeParser(index)
+    parser.feed(b'0.000000,0,K_\n2.000000,0,K_\n4.000000,0,K_\n4.500000,0,__\n')
+    # the last keyframe found so far stands in for the end of file in getGOPbisections
+    assert index.covers(1.0, 1.5)
+    assert not index.covers(2.5, 3.5)
+    assert not index.covers(1.0, 4.2)
+    assert index.progress == 0.45
+    parser.close()
+    assert index.covers(1.0, 9.0)
+    assert index.progress == 1.0
+
+
+def test_covered_partial_index_bisects_like_the_full_one():
+    from vidcutter.libs.videoservice import VideoService
+
+    class Service:
+        def __init__(self, times):
+            self.times = times
+
+        def clipKeyframes(self, source, start, end):
+            return self.times
+
+    full = KeyframeIndex('clip.mp4', 10.0)
+    [full.add(pts) for pts in (0.0, 2.0, 4.0, 6.0, 8.0)]
+    full.finalize()
+    partial = KeyframeIndex('clip.mp4', 10.0)
+    parser = KeyframeParser(partial)
+    parser.feed(b'0.000000,0,K_\n2.000000,0,K_\n4.000000,0,K_\n6.000000,0,K_\n6.500000,0,__\n')
+    assert not partial.covers(1.0, 5.0)
+    for start, end in ((1.0, 3.0), (2.5, 3.5)):
+        assert partial.covers(start, end)
+        assert VideoService.getGOPbisections(Service(partial.times), 'clip.mp4', start, end) == \
+            VideoService.getGOPbisections(Service(full.times), 'clip.mp4', start, end)
+
+
+def test_formatted_times():
+    assert KeyframeIndex.formatTime(3723.456) == '1:02:03.456'
+    assert KeyframeIndex.formatTime(0.0004) == '0:00:00.000'
+
+
+def test_save_load_roundtrip(tmp_path):
+    index = KeyframeIndex('clip.mp4', 6.0)
+    for pts, pos in ((0.0, 48), (2.0, 9000), (4.0, 18000)):
+        index.add(pts, pos)
+    index.finalize()
+    path = str(tmp_path / 'clip.kfi')
+    index.save(path)
+    loaded = KeyframeIndex.load(path, 'clip.mp4')
+    assert loaded.complete and loaded.duration == 6.0
+    assert list(loaded.times) == [0.0, 2.0, 4.0, 6.0]
+    assert list(loaded.positions) == [48, 9000, 18000, -1]
+
+
+def test_load_rejects_truncated_or_foreign_files(tmp_path):
+    index = KeyframeIndex('clip.mp4', 2.0)
+    index.finalize()
+    path = tmp_path / 'clip.kfi'
+    index.save(str(path))
+    path.write_bytes(path.read_bytes()[:-1])
+    assert KeyframeIndex.load(str(path), 'clip.mp4') is None
+    path.write_bytes(b'XXXX' + b'\x00' * 40)
+    assert KeyframeIndex.load(str(path), 'clip.mp4') is None
+
+
+def test_cache_keeps_complete_indexes_and_evicts(tmp_path, media):
+    cache = KeyframeCache(str(tmp_path / 'keyframes'), maxentries=1)
+    first, second = media('a.mp4'), media('b.mp4')
+    partial = KeyframeIndex(first, 4.0)
+    cache.put(partial)
+    assert cache.get(first) is None
+    partial.finalize()
+    cache.put(partial)
+    assert list(cache.get(first).times) == [4.0]
+    complete = KeyframeIndex(second, 4.0)
+    complete.finalize()
+    time.sleep(0.01)
+    cache.put(complete)
+    assert cache.get(first) is None
+    assert cache.get(second) is not None
+
+
+def test_set_duration_moves_the_end_of_file_sentinel():
+    index = KeyframeIndex('clip.mp4', 9.5)
+    [index.add(pts, pos) for pts, pos in ((0.0, 0), (2.0, 100), (4.0, 200))]
+    index.finalize()
+    index.setDuration(10.0)
+    assert list(index.times) == [0.0, 2.0, 4.0, 10.0] and index.positions[-1] == -1
+    assert index.scanned == 10.0 and index.complete
+    running = KeyframeIndex('clip.mp4', 9.5)
+    running.add(0.0, 0)
+    running.scanned = 5.0
+    running.setDuration(10.0)
+    assert list(running.times) == [0.0] and running.progress == 0.5
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from vidcutter.libs.mediamodel import MediaFormat, MediaStreams
+
+PROBE = {
+    'format': {'filename': 'clip.mkv', 'format_name': 'matroska,webm', 'duration': '60.500', 'size': '1048576',
+               'bit_rate': '138000', 'nb_streams': '4', 'tags': {'title': 'clip'}},
+    'streams': [
+        {'index': 0, 'codec_type': 'video', 'codec_name': 'h264', 'width': 1920, 'height': 1080,
+         'avg_frame_rate': '30000/1001', 'display_aspect_ratio': '16:9', 'pix_fmt': 'yuv420p'},
+        {'index': 1, 'codec_type': 'audio', 'codec_name': 'aac', 'sample_rate': '48000', 'channels': 2,
+         'tags': {'language': 'eng'}},
+        {'index': 2, 'codec_type': 'audio', 'codec_name': 'ac3', 'sample_rate': '44100', 'channels': 6},
+        {'index': 3, 'codec_type': 'subtitle', 'codec_name': 'subrip'}
+    ]
+}
+
+
+def test_full_probe():
+    media = MediaFormat.fromJSON(json.dumps(PROBE))
+    assert not media.partial
+    assert media.duration == 60.5
+    assert (media.size, media.nb_streams) == (1048576, 4)
+    assert [len(media.video), len(media.audio), len(media.subtitle)] == [1, 2, 1]
+    video = media.video[0]
+    assert (video.width, video.height, video.pix_fmt) == (1920, 1080, 'yuv420p')
+    assert video.frame_rate == pytest.approx(29.97, abs=0.01)
+    assert video.aspect_ratio == pytest.approx(16 / 9)
+    assert media.audio[0].tags['language'] == 'eng'
+
+
+def test_partial_probe_falls_back_to_stream_duration():
+    data = {'format': {'filename': 'clip.mp4'},
+            'streams': [{'index': 0, 'codec_type': 'video', 'duration': '12.25', 'avg_frame_rate': '0/0'}]}
+    media = MediaFormat(data, partial=True)
+    assert media.partial
+    assert media.duration == 12.25
+    assert media.nb_streams == 1
+    assert media.video[0].frame_rate == 0.0
+    assert media.audio == [] and media.subtitle == []
+
+
+def test_malformed_values_use_defaults():
+    media = MediaFormat({'format': {'duration': 'N/A', 'size': None},
+                         'streams': [{'codec_type': 'video', 'width': 'x', 'display_aspect_ratio': '0:1',
+                                      'height': 0}]})
+    assert media.duration == 0.0 and media.size == 0
+    assert media.video[0].width == 0
+    assert media.video[0].aspect_ratio == 0.0
+
+
+def test_streams_truthiness():
+    assert not MediaStreams()
+    streams = MediaStreams(MediaFormat(PROBE))
+    assert streams
+    assert streams.video.index == 0
+    assert [stream.index for stream in streams.audio] == [1, 2]
+    audio_only = MediaStreams(MediaFormat({'streams': [{'codec_type': 'audio'}]}))
+    assert not audio_only and audio_only.video is None and len(audio_only.audio) == 1
+
+
+def test_stream_selector_builds_from_model(qapp):
+    from PyQt5.QtWidgets import QWidget
+    from vidcutter.libs.munch import Munch
+    from vidcutter.mediastream import StreamSelector
+
+    class Parent(QWidget):
+        theme = 'dark'
+        currentMedia = 'clip.mkv'
+
+    service = Munch(streams=MediaStreams(MediaFormat(PROBE)), mappings=[True] * 4)
+    selector = StreamSelector(service, Parent())
+    # video, audio and subtitle groups plus the button box
+    assert selector.layout().count() == 4
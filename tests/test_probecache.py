@@ -0,0 +1,61 @@
+import os
+import time
+
+from vidcutter.libs.mediacache import MediaSignature, ProbeCache
+
+
+def test_signature_key_tracks_file_identity(media):
+    first, second = media('a.mp4'), media('b.mp4')
+    key = MediaSignature.key(first)
+    assert key == MediaSignature.key(first)
+    assert key != MediaSignature.key(second)
+    os.utime(first, (time.time() + 10, time.time() + 10))
+    assert key != MediaSignature.key(first)
+    assert MediaSignature.key(first + '.missing') is None
+
+
+def test_fingerprint_changes_key(media):
+    source = media('a.mp4', b'\x01' * 4096)
+    assert MediaSignature.key(source) != MediaSignature.key(source, fingerprint=True)
+
+
+def test_get_put_roundtrip(tmp_path, media):
+    cache = ProbeCache(str(tmp_path / 'cache' / 'probes.db'))
+    source = media('a.mp4')
+    assert cache.get(source) is None
+    cache.put(source, '{"format": {}}')
+    assert cache.get(source) == '{"format": {}}'
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_modified_file_misses(tmp_path, media):
+    cache = ProbeCache(str(tmp_path / 'probes.db'))
+    source = media('a.mp4')
+    cache.put(source, '{}')
+    with open(source, 'ab') as f:
+        f.write(b'\x00')
+    assert cache.get(source) is None
+
+
+def test_evicts_least_recently_used(tmp_path, media):
+    cache = ProbeCache(str(tmp_path / 'probes.db'), maxentries=2)
+    sources = [media('{}.mp4'.format(i)) for i in range(3)]
+    for source in sources[:2]:
+        cache.put(source, '{}')
+        time.sleep(0.01)
+    cache.get(sources[0])
+    time.sleep(0.01)
+    cache.put(sources[2], '{}')
+    assert cache.count() == 2
+    assert cache.get(sources[1]) is None
+    assert cache.get(sources[0]) is not None
+    assert cache.stats.evictions == 1
+
+
+def test_disabled_cache(tmp_path, media):
+    cache = ProbeCache(str(tmp_path / 'probes.db'), maxentries=0)
+    source = media('a.mp4')
+    cache.put(source, '{}')
+    assert not cache.enabled
+    assert cache.get(source) is None
+    assert cache.count() == 0
@@ -0,0 +1,68 @@
+import os
+import time
+
+from vidcutter.libs.mediacache import ThumbnailCache
+
+
+def test_keys_separate_every_capture_parameter():
+    base = ThumbnailCache.key('media', '00:00:01.000', 100, 70)
+    assert base == ThumbnailCache.key('media', '00:00:01.000', 100, 70)
+    variants = [ThumbnailCache.key('other', '00:00:01.000', 100, 70),
+                ThumbnailCache.key('media', '00:00:02.000', 100, 70),
+                ThumbnailCache.key('media', '00:00:01.000', 100, 71),
+                ThumbnailCache.key('media', '00:00:01.000', 100, 70, external=True),
+                ThumbnailCache.key('media', '00:00:01.000', 100, 70, fast=True)]
+    assert len(set(variants + [base])) == len(variants) + 1
+
+
+def test_media_key_follows_file_identity(tmp_path, media):
+    cache = ThumbnailCache(str(tmp_path / 'thumbs'))
+    source = media('a.mp4')
+    key = cache.mediaKey(source)
+    assert key is not None and key == cache.mediaKey(source)
+    with open(source, 'ab') as f:
+        f.write(b'\x00')
+    assert cache.mediaKey(source) != key
+
+
+def test_put_get_and_size(tmp_path):
+    cache = ThumbnailCache(str(tmp_path / 'thumbs'))
+    assert cache.get('a') is None
+    cache.put('a', b'\xff' * 100)
+    cache.put('a', b'\xff' * 40)
+    assert cache.get('a') == b'\xff' * 40
+    assert (cache.count(), cache.size()) == (1, 40)
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+    assert not [name for name in os.listdir(cache.path) if name.endswith('.tmp')]
+
+
+def test_evicts_least_recently_used_to_ninety_percent(tmp_path):
+    cache = ThumbnailCache(str(tmp_path / 'thumbs'), maxbytes=1000)
+    for key in 'abcd':
+        cache.put(key, b'\x00' * 240)
+        time.sleep(0.01)
+    cache.get('a')
+    time.sleep(0.01)
+    cache.put('e', b'\x00' * 240)
+    # 1200 bytes is over budget, the two oldest untouched entries go to get under 900
+    assert cache.get('b') is None and cache.get('c') is None
+    assert all(cache.get(key) is not None for key in 'ade')
+    assert cache.size() == 720 and cache.stats.evictions == 2
+
+
+def test_reopen_trims_existing_entries(tmp_path):
+    path = str(tmp_path / 'thumbs')
+    cache = ThumbnailCache(path, maxbytes=10000)
+    for key in 'abc':
+        cache.put(key, b'\x00' * 400)
+    assert ThumbnailCache(path, maxbytes=1000).size() <= 900
+
+
+def test_clear_and_disabled(tmp_path):
+    cache = ThumbnailCache(str(tmp_path / 'thumbs'))
+    cache.put('a', b'\x00' * 10)
+    cache.clear()
+    assert (cache.count(), cache.size()) == (0, 0)
+    disabled = ThumbnailCache(str(tmp_path / 'off'), maxbytes=0)
+    disabled.put('a', b'\x00')
+    assert disabled.get('a') is None and not os.path.exists(str(tmp_path / 'off'))
@@ -0,0 +1,56 @@
+from PyQt5.QtCore import QSettings
+
+from vidcutter.libs.thumbnails import ThumbnailScheduler
+
+
+def test_cancel_all_forgets_dropped_jobs(qapp, tmp_path):
+    scheduler = ThumbnailScheduler(QSettings(str(tmp_path / 'settings.ini'), QSettings.IniFormat), 1)
+    finished = []
+    scheduler.jobFinished.connect(finished.append)
+    # a missing source fails fast, the queued batches behind it are what clear() drops
+    jobs = [scheduler.submit(str(tmp_path / 'missing.mp4'), ['00:00:0{}.000'.format(i) for i in range(1, 5)])
+            for _ in range(3)]
+    scheduler.cancelAll()
+    assert scheduler.pending == {} and scheduler.cancelled == set()
+    assert all(scheduler.isCancelled(job) for job in jobs)
+    scheduler.pool.waitForDone()
+    qapp.processEvents()
+    assert scheduler.pending == {} and finished == []
+    job = scheduler.submit(str(tmp_path / 'missing.mp4'), [])
+    assert not scheduler.isCancelled(job) and finished == [job]
+
+
+def test_cancel_single_job(qapp, tmp_path):
+    scheduler = ThumbnailScheduler(QSettings(str(tmp_path / 'settings.ini'), QSettings.IniFormat), 1)
+    finished = []
+    scheduler.jobFinished.connect(finished.append)
+    first = scheduler.submit(str(tmp_path / 'missing.mp4'), ['00:00:01.000', '00:00:02.000'])
+    second = scheduler.submit(str(tmp_path / 'missing.mp4'), ['00:00:01.000'])
+    scheduler.cancel(first)
+    scheduler.pool.waitForDone()
+    qapp.processEvents()
+    assert finished == [second]
+    assert scheduler.pending == {} and scheduler.cancelled == set()
+
+
+def test_batched_filmstrips_stay_small(qapp, tmp_path):
+    class Pool:
+        def __init__(self):
+            self.tasks = []
+
+        def maxThreadCount(self):
+            return 8
+
+        def start(self, task, priority=0):
+            self.tasks.append(task)
+
+    scheduler = ThumbnailScheduler(QSettings(str(tmp_path / 'settings.ini'), QSettings.IniFormat), 1)
+    scheduler.pool = Pool()
+    # a long project gets more filmstrips, never longer ones
+    scheduler.submit(str(tmp_path / 'missing.mp4'), ['00:00:01.000'] * 300, batched=True)
+    assert len(scheduler.pool.tasks) == 38
+    assert max(len(task.slots) for task in scheduler.pool.tasks) == ThumbnailScheduler.BATCH_INPUTS
+    # short strips still spread over every worker
+    scheduler.pool.tasks.clear()
+    scheduler.submit(str(tmp_path / 'missing.mp4'), ['00:00:01.000'] * 16, batched=True)
+    assert [len(task.slots) for task in scheduler.pool.tasks] == [2] * 8
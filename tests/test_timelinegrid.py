@@ -0,0 +1,37 @@
+from vidcutter.videoslider import VideoSlider
+
+
+class Range:
+    def __init__(self, minimum: int, maximum: int):
+        self._minimum, self._maximum = minimum, maximum
+
+    def minimum(self) -> int:
+        return self._minimum
+
+    def maximum(self) -> int:
+        return self._maximum
+
+
+def test_grid_keys_reduce_to_lowest_level():
+    assert VideoSlider.gridKey(0, 4) == (0, 0)
+    assert VideoSlider.gridKey(8, 4) == (1, 1)
+    assert VideoSlider.gridKey(6, 3) == (3, 2)
+    assert VideoSlider.gridKey(5, 3) == (5, 3)
+
+
+def test_coarser_strips_reuse_finer_cells():
+    # every cell of an 8 slot strip is the same point in time as a cell of the 16 slot strip
+    coarse = {VideoSlider.gridKey(cell, 3) for cell in range(8)}
+    fine = {VideoSlider.gridKey(cell, 4) for cell in range(16)}
+    assert coarse < fine
+    assert len(fine) == 16
+
+
+def test_grid_times():
+    slider = Range(0, 64000)
+    assert VideoSlider.gridTime(slider, (1, 1)) == 32000
+    assert VideoSlider.gridTime(slider, (3, 2)) == 48000
+    assert VideoSlider.gridTime(slider, VideoSlider.gridKey(12, 4)) == 48000
+    # the first cell starts a second in because opening frames are often black
+    assert VideoSlider.gridTime(slider, (0, 0)) == 1000
+    assert VideoSlider.gridTime(Range(5000, 6000), (1, 1)) == 5500
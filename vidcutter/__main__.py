@@ -40,6 +40,7 @@ from PyQt5.QtWidgets import qApp, QMainWindow, QMessageBox, QSizePolicy
 from vidcutter.videoconsole import ConsoleHandler, ConsoleWidget, VideoLogger
 from vidcutter.videocutter import VideoCutter
 
+from vidcutter.libs.mpvthumbnailer import MpvThumbnailer
 from vidcutter.libs.singleapplication import SingleApplication
 from vidcutter.libs.widgets import VCMessageBox
 
@@ -297,11 +298,11 @@ class MainWindow(QMainWindow):
         try:
             if self.isEnabled() and self.cutter.mediaAvailable and self.cutter.thumbnailsButton.isChecked():
                 if self.cutter.seekSlider.thumbnailsOn:
-                    self.cutter.sliderWidget.setLoader(True)
                     self.cutter.sliderWidget.hideThumbs()
+                self.cutter.seekSlider.cancelThumbs()
                 if self.resizeTimer:
                     self.killTimer(self.resizeTimer)
-                self.resizeTimer = self.startTimer(500)
+                self.resizeTimer = self.startTimer(self.cutter.seekSlider.thumbsTimer.interval())
         except AttributeError:
             pass
 
@@ -344,6 +345,9 @@ class MainWindow(QMainWindow):
                         self.cutter.videoService.cleanup(job.files.values())
                         for job in self.cutter.videoService.smartcut_jobs
                     ]
+                self.cutter.videoService.cancelKeyframes()
+                self.cutter.thumbnailer.cancelAll()
+                MpvThumbnailer.shutdown()
                 if hasattr(self.cutter, 'mpvWidget'):
                     self.cutter.mpvWidget.shutdown()
             except AttributeError:
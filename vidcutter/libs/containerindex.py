@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+import os
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+# (strategy, keyframe pts in seconds, keyframe byte positions)
+ContainerKeyframes = Tuple[str, List[float], List[int]]
+
+
+def _uints(data: bytes, start: int, count: int, typecode: str='I') -> array:
+    values = array(typecode)
+    values.frombytes(data[start:start + count * values.itemsize])
+    if sys.byteorder == 'little':
+        values.byteswap()
+    return values
+
+
+class MP4Index:
+    containers = {b'moov', b'trak', b'mdia', b'minf', b'stbl', b'edts'}
+
+    @staticmethod
+    def boxes(data: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+        while start + 8 <= end:
+            size, kind = struct.unpack_from('>I4s', data, start)
+            header = 8
+            if size == 1:
+                size = struct.unpack_from('>Q', data, start + 8)[0]
+                header = 16
+            elif size == 0:
+                size = end - start
+            if size < header:
+                return
+            yield kind, start + header, min(start + size, end)
+            start += size
+
+    @staticmethod
+    def children(data: bytes, start: int, end: int) -> dict:
+        found = {}
+        for kind, payload, boxend in MP4Index.boxes(data, start, end):
+            found.setdefault(kind, []).append((payload, boxend))
+        return found
+
+    @staticmethod
+    def moov(f: BinaryIO, filesize: int) -> Optional[bytes]:
+        offset, moov = 0, None
+        while offset + 8 <= filesize:
+            f.seek(offset)
+            size, kind = struct.unpack('>I4s', f.read(8))
+            header = 8
+            if size == 1:
+                size = struct.unpack('>Q', f.read(8))[0]
+                header = 16
+            elif size == 0:
+                size = filesize - offset
+            if size < header:
+                return None
+            if kind == b'moof':
+                # fragmented files keep their samples outside of moov
+                return None
+            if kind == b'moov':
+                moov = f.read(size - header)
+            offset += size
+        return moov
+
+    @staticmethod
+    def read(f: BinaryIO, filesize: int) -> Optional[ContainerKeyframes]:
+        moov = MP4Index.moov(f, filesize)
+        if moov is None:
+            return None
+        top = MP4Index.children(moov, 0, len(moov))
+        movie_timescale = 0
+        if b'mvhd' in top:
+            payload, _ = top[b'mvhd'][0]
+            movie_timescale = struct.unpack_from('>I', moov, payload + (20 if moov[payload] == 1 else 12))[0]
+        for payload, end in top.get(b'trak', []):
+            result = MP4Index.track(moov, payload, end, movie_timescale)
+            if result is not None:
+                return result
+        return None
+
+    @staticmethod
+    def track(data: bytes, start: int, end: int, movie_timescale: int) -> Optional[ContainerKeyframes]:
+        trak = MP4Index.children(data, start, end)
+        if b'mdia' not in trak:
+            return None
+        mdia = MP4Index.children(data, *trak[b'mdia'][0])
+        if b'hdlr' not in mdia or b'mdhd' not in mdia or b'minf' not in mdia:
+            return None
+        hdlr, _ = mdia[b'hdlr'][0]
+        if data[hdlr + 8:hdlr + 12] != b'vide':
+            return None
+        mdhd, _ = mdia[b'mdhd'][0]
+        timescale = struct.unpack_from('>I', data, mdhd + (20 if data[mdhd] == 1 else 12))[0]
+        minf = MP4Index.children(data, *mdia[b'minf'][0])
+        if b'stbl' not in minf or not timescale:
+            return None
+        stbl = MP4Index.children(data, *minf[b'stbl'][0])
+        if b'stts' not in stbl or b'stsz' not in stbl or b'stsc' not in stbl:
+            return None
+        # edit list: leading empty edit delays the track, media_time trims the start
+        media_time, delay = 0, 0.0
+        if b'edts' in trak:
+            edts = MP4Index.children(data, *trak[b'edts'][0])
+            if b'elst' in edts:
+                elst, _ = edts[b'elst'][0]
+                version = data[elst]
+                count = struct.unpack_from('>I', data, elst + 4)[0]
+                entry = '>Qq' if version == 1 else '>Ii'
+                offset = elst + 8
+                for _ in range(count):
+                    duration, mtime = struct.unpack_from(entry, data, offset)
+                    offset += struct.calcsize(entry) + 4
+                    if mtime == -1:
+                        delay += duration / movie_timescale if movie_timescale else 0.0
+                    else:
+                        media_time = mtime
+                        break
+        stsz, _ = stbl[b'stsz'][0]
+        sample_size, sample_count = struct.unpack_from('>II', data, stsz + 4)
+        sizes = _uints(data, stsz + 12, sample_count) if sample_size == 0 else None
+        if not sample_count:
+            return None
+        if b'stss' in stbl:
+            stss, _ = stbl[b'stss'][0]
+            sync = _uints(data, stss + 8, struct.unpack_from('>I', data, stss + 4)[0])
+        else:
+            # no sync sample table means every sample is a sync sample
+            sync = array('I', range(1, sample_count + 1))
+        if not len(sync):
+            return None
+        stts, _ = stbl[b'stts'][0]
+        stts = _uints(data, stts + 8, struct.unpack_from('>I', data, stts + 4)[0] * 2)
+        dts = MP4Index.decodeTimes(stts, sync)
+        offsets = [0] * len(sync)
+        if b'ctts' in stbl:
+            ctts, _ = stbl[b'ctts'][0]
+            # offsets are signed even in version 0 boxes, where muxers write negative values regardless
+            runs = _uints(data, ctts + 8, struct.unpack_from('>I', data, ctts + 4)[0] * 2, 'i')
+            offsets = MP4Index.compositionOffsets(runs, sync)
+        times = [(d + o - media_time) / timescale + delay for d, o in zip(dts, offsets)]
+        positions = MP4Index.samplePositions(data, stbl, sync, sample_size, sizes)
+        return 'mp4 stss', times, positions
+
+    @staticmethod
+    def decodeTimes(stts: array, sync: array) -> List[int]:
+        times, sample, dts, si = [], 1, 0, 0
+        for i in range(0, len(stts), 2):
+            count, delta = stts[i], stts[i + 1]
+            while si < len(sync) and sync[si] < sample + count:
+                times.append(dts + (sync[si] - sample) * delta)
+                si += 1
+            sample += count
+            dts += count * delta
+        return times + [dts] * (len(sync) - len(times))
+
+    @staticmethod
+    def compositionOffsets(ctts: array, sync: array) -> List[int]:
+        offsets, sample, si = [], 1, 0
+        for i in range(0, len(ctts), 2):
+            count, offset = ctts[i], ctts[i + 1]
+            while si < len(sync) and sync[si] < sample + count:
+                offsets.append(offset)
+                si += 1
+            sample += count
+        return offsets + [0] * (len(sync) - len(offsets))
+
+    @staticmethod
+    def samplePositions(data: bytes, stbl: dict, sync: array, sample_size: int, sizes: Optional[array]) -> List[int]:
+        if b'stco' in stbl:
+            stco, _ = stbl[b'stco'][0]
+            chunks = _uints(data, stco + 8, struct.unpack_from('>I', data, stco + 4)[0])
+        elif b'co64' in stbl:
+            co64, _ = stbl[b'co64'][0]
+            chunks = _uints(data, co64 + 8, struct.unpack_from('>I', data, co64 + 4)[0], 'Q')
+        else:
+            return [-1] * len(sync)
+        stsc, _ = stbl[b'stsc'][0]
+        entries = struct.unpack_from('>I', data, stsc + 4)[0]
+        stsc = _uints(data, stsc + 8, entries * 3)
+        positions, sample, si = [], 1, 0
+        for e in range(entries):
+            first, per_chunk = stsc[e * 3], stsc[e * 3 + 1]
+            last = stsc[(e + 1) * 3] - 1 if e + 1 < entries else len(chunks)
+            for chunk in range(first, last + 1):
+                if si >= len(sync) or chunk > len(chunks):
+                    break
+                if sync[si] < sample + per_chunk:
+                    offset, current = chunks[chunk - 1], sample
+                    while si < len(sync) and sync[si] < sample + per_chunk:
+                        target = sync[si]
+                        offset += (target - current) * sample_size if sizes is None \
+                            else sum(sizes[current - 1:target - 1])
+                        current = target
+                        positions.append(offset)
+                        si += 1
+                sample += per_chunk
+        return positions + [-1] * (len(sync) - len(positions))
+
+
+class MatroskaIndex:
+    EBML = 0x1A45DFA3
+    SEGMENT = 0x18538067
+    SEEKHEAD = 0x114D9B74
+    SEEK = 0x4DBB
+    SEEKID = 0x53AB
+    SEEKPOSITION = 0x53AC
+    INFO = 0x1549A966
+    TIMECODESCALE = 0x2AD7B1
+    DURATION = 0x4489
+    TRACKS = 0x1654AE6B
+    TRACKENTRY = 0xAE
+    TRACKNUMBER = 0xD7
+    TRACKTYPE = 0x83
+    DEFAULTDURATION = 0x23E383
+    CLUSTER = 0x1F43B675
+    CUES = 0x1C53BB6B
+    CUEPOINT = 0xBB
+    CUETIME = 0xB3
+    CUETRACKPOSITIONS = 0xB7
+    CUETRACK = 0xF7
+    CUECLUSTERPOSITION = 0xF1
+
+    # x264/x265 default keyint; cues spaced wider than this many frames only mark some of the keyframes
+    typical_gop = 250
+
+    @staticmethod
+    def vint(data: bytes, pos: int, mask: bool = True) -> Tuple[int, int]:
+        first = data[pos]
+        length = 1
+        while length <= 8 and not first & (0x80 >> (length - 1)):
+            length += 1
+        if length > 8:
+            raise ValueError('invalid EBML variable length integer')
+        value = first & (0xFF >> length) if mask else first
+        for b in data[pos + 1:pos + length]:
+            value = (value << 8) | b
+        return value, length
+
+    @staticmethod
+    def element(data: bytes, pos: int) -> Tuple[int, int, int]:
+        eid, idlen = MatroskaIndex.vint(data, pos, False)
+        size, sizelen = MatroskaIndex.vint(data, pos + idlen)
+        if size == (1 << (7 * sizelen)) - 1:
+            size = -1
+        return eid, pos + idlen + sizelen, size
+
+    @staticmethod
+    def elements(data: bytes, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+        while start < end:
+            eid, payload, size = MatroskaIndex.element(data, start)
+            if size < 0:
+                return
+            yield eid, payload, size
+            start = payload + size
+
+    @staticmethod
+    def uint(data: bytes, pos: int, size: int) -> int:
+        return int.from_bytes(data[pos:pos + size], 'big')
+
+    @staticmethod
+    def floating(data: bytes, pos: int, size: int) -> float:
+        if size == 4:
+            return struct.unpack('>f', data[pos:pos + 4])[0]
+        if size == 8:
+            return struct.unpack('>d', data[pos:pos + 8])[0]
+        return 0.0
+
+    @staticmethod
+    def readElement(f: BinaryIO, offset: int) -> Tuple[int, int, int]:
+        f.seek(offset)
+        head = f.read(16)
+        if len(head) < 2:
+            raise ValueError('unexpected end of file')
+        eid, payload, size = MatroskaIndex.element(head, 0)
+        return eid, offset + payload, size
+
+    @staticmethod
+    def read(f: BinaryIO, filesize: int) -> Optional[ContainerKeyframes]:
+        eid, payload, size = MatroskaIndex.readElement(f, 0)
+        if eid != MatroskaIndex.EBML:
+            return None
+        eid, segment, size = MatroskaIndex.readElement(f, payload + size)
+        if eid != MatroskaIndex.SEGMENT:
+            return None
+        end = filesize if size < 0 else min(segment + size, filesize)
+        found, cues_position, offset = {}, None, segment
+        while offset < end and MatroskaIndex.CUES not in found:
+            eid, payload, size = MatroskaIndex.readElement(f, offset)
+            if eid in {MatroskaIndex.SEEKHEAD, MatroskaIndex.INFO, MatroskaIndex.TRACKS, MatroskaIndex.CUES} \
+                    and size >= 0:
+                f.seek(payload)
+                found[eid] = f.read(size)
+                if eid == MatroskaIndex.SEEKHEAD:
+                    cues_position = MatroskaIndex.seekPosition(found[eid], MatroskaIndex.CUES)
+            elif eid == MatroskaIndex.CLUSTER and cues_position is not None:
+                # jump straight over the clusters to the cues the seek head points at
+                offset = segment + cues_position
+                cues_position = None
+                continue
+            if size < 0:
+                return None
+            offset = payload + size
+        if MatroskaIndex.CUES not in found or MatroskaIndex.TRACKS not in found:
+            return None
+        timescale, duration = 1000000, 0.0
+        if MatroskaIndex.INFO in found:
+            info = found[MatroskaIndex.INFO]
+            for eid, payload, size in MatroskaIndex.elements(info, 0, len(info)):
+                if eid == MatroskaIndex.TIMECODESCALE:
+                    timescale = MatroskaIndex.uint(info, payload, size)
+                elif eid == MatroskaIndex.DURATION:
+                    duration = MatroskaIndex.floating(info, payload, size)
+        video = MatroskaIndex.videoTrack(found[MatroskaIndex.TRACKS])
+        if video is None:
+            return None
+        track, frameduration = video
+        times, positions = MatroskaIndex.cuePoints(found[MatroskaIndex.CUES], track, timescale, segment)
+        if len(times) < 2 or MatroskaIndex.sparse(times, duration * timescale / 1000000000,
+                                                   frameduration / 1000000000):
+            return None
+        return 'matroska cues', times, positions
+
+    @staticmethod
+    def sparse(times: List[float], duration: float, frametime: float) -> bool:
+        # many muxers only cue one keyframe per cluster or every few seconds, which would snap cuts far from
+        # the nearest real keyframe; treat those indexes as partial so the packet scan runs instead
+        spacing = MatroskaIndex.typical_gop * (frametime if frametime > 0 else 0.04)
+        duration = max(duration, times[-1])
+        if len(times) < duration / spacing:
+            return True
+        gaps = [b - a for a, b in zip(times, times[1:])] + [duration - times[-1]]
+        return max(gaps) > spacing * 2
+
+    @staticmethod
+    def seekPosition(seekhead: bytes, target: int) -> Optional[int]:
+        for eid, payload, size in MatroskaIndex.elements(seekhead, 0, len(seekhead)):
+            if eid != MatroskaIndex.SEEK:
+                continue
+            seekid, position = None, None
+            for child, cpayload, csize in MatroskaIndex.elements(seekhead, payload, payload + size):
+                if child == MatroskaIndex.SEEKID:
+                    seekid = MatroskaIndex.uint(seekhead, cpayload, csize)
+                elif child == MatroskaIndex.SEEKPOSITION:
+                    position = MatroskaIndex.uint(seekhead, cpayload, csize)
+            if seekid == target:
+                return position
+        return None
+
+    @staticmethod
+    def videoTrack(tracks: bytes) -> Optional[Tuple[int, int]]:
+        # track number and default frame duration in nanoseconds (0 when the muxer left it out)
+        for eid, payload, size in MatroskaIndex.elements(tracks, 0, len(tracks)):
+            if eid != MatroskaIndex.TRACKENTRY:
+                continue
+            number, kind, frameduration = None, None, 0
+            for child, cpayload, csize in MatroskaIndex.elements(tracks, payload, payload + size):
+                if child == MatroskaIndex.TRACKNUMBER:
+                    number = MatroskaIndex.uint(tracks, cpayload, csize)
+                elif child == MatroskaIndex.TRACKTYPE:
+                    kind = MatroskaIndex.uint(tracks, cpayload, csize)
+                elif child == MatroskaIndex.DEFAULTDURATION:
+                    frameduration = MatroskaIndex.uint(tracks, cpayload, csize)
+            if kind == 1:
+                return number, frameduration
+        return None
+
+    @staticmethod
+    def cuePoints(cues: bytes, track: int, timescale: int, segment: int) -> Tuple[List[float], List[int]]:
+        times, positions = [], []
+        for eid, payload, size in MatroskaIndex.elements(cues, 0, len(cues)):
+            if eid != MatroskaIndex.CUEPOINT:
+                continue
+            cuetime = None
+            for child, cpayload, csize in MatroskaIndex.elements(cues, payload, payload + size):
+                if child == MatroskaIndex.CUETIME:
+                    cuetime = MatroskaIndex.uint(cues, cpayload, csize)
+                elif child == MatroskaIndex.CUETRACKPOSITIONS and cuetime is not None:
+                    cuetrack, cluster = None, -1
+                    for pos, ppayload, psize in MatroskaIndex.elements(cues, cpayload, cpayload + csize):
+                        if pos == MatroskaIndex.CUETRACK:
+                            cuetrack = MatroskaIndex.uint(cues, ppayload, psize)
+                        elif pos == MatroskaIndex.CUECLUSTERPOSITION:
+                            cluster = segment + MatroskaIndex.uint(cues, ppayload, psize)
+                    if cuetrack == track:
+                        times.append(cuetime * timescale / 1000000000)
+                        positions.append(cluster)
+        return times, positions
+
+
+class ContainerIndex:
+    @staticmethod
+    def read(source: str) -> Optional[ContainerKeyframes]:
+        filesize = os.path.getsize(source)
+        with open(source, 'rb') as f:
+            head = f.read(12)
+            if len(head) < 12:
+                return None
+            if head[4:8] in {b'ftyp', b'moov', b'mdat', b'free', b'wide', b'skip'}:
+                return MP4Index.read(f, filesize)
+            if head[:4] == b'\x1a\x45\xdf\xa3':
+                return MatroskaIndex.read(f, filesize)
+        return None
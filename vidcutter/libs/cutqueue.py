@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+import logging
+from typing import List
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QElapsedTimer, QObject, QRunnable, QThreadPool
+
+from vidcutter.libs.munch import Munch
+from vidcutter.libs.videoservice import VideoService
+
+
+class CutSignals(QObject):
+    completed = pyqtSignal(int, bool)
+
+
+class CutTask(QRunnable):
+    def __init__(self, service: VideoService, job: Munch, signals: CutSignals):
+        super(CutTask, self).__init__()
+        self.service = service
+        self.job = job
+        self.signals = signals
+        self.setAutoDelete(True)
+
+    # noinspection PyBroadException
+    def run(self) -> None:
+        result = False
+        try:
+            result = self.service.cut(source=self.job.source, output=self.job.output, frametime=self.job.frametime,
+                                      duration=self.job.duration, allstreams=True, stream_maps=self.job.stream_maps)
+        except Exception:
+            logging.getLogger(__name__).exception('Exception cutting clip {}'.format(self.job.index), exc_info=True)
+        finally:
+            self.signals.completed.emit(self.job.index, result)
+
+
+class ClipCutter(QObject):
+    clipCut = pyqtSignal(int, bool)
+    finished = pyqtSignal(bool)
+
+    def __init__(self, service: VideoService, workers: int, parent=None):
+        super(ClipCutter, self).__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.service = service
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, workers))
+        self.signals = CutSignals(self)
+        self.signals.completed.connect(self.on_completed)
+        self.timer = QElapsedTimer()
+        self.pending, self.failed = 0, []
+
+    @property
+    def running(self) -> bool:
+        return self.pending > 0
+
+    def start(self, jobs: List[Munch]) -> None:
+        if not len(jobs):
+            self.finished.emit(True)
+            return
+        self.pending, self.failed = len(jobs), []
+        self.timer.start()
+        # stream selection lives on the GUI thread and may change while the cuts run, so take it once here
+        stream_maps = self.service.parseMappings(True), self.service.parseMappings(False)
+        # stream copy cuts are mostly I/O so they overlap well; output names are fixed up front so the join
+        # order never depends on which cut finishes first
+        for job in jobs:
+            job.stream_maps = stream_maps
+            self.pool.start(CutTask(self.service, job, self.signals))
+        self.logger.info('cutting {0} clips with {1} workers'.format(len(jobs), self.pool.maxThreadCount()))
+
+    @pyqtSlot(int, bool)
+    def on_completed(self, index: int, result: bool) -> None:
+        if not result:
+            self.failed.append(index)
+        self.clipCut.emit(index, result)
+        self.pending -= 1
+        if self.pending == 0:
+            self.logger.info('cut stage finished in {0} ms ({1} failed)'.format(self.timer.elapsed(),
+                                                                                len(self.failed)))
+            self.finished.emit(not len(self.failed))
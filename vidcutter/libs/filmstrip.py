@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+from PyQt5.QtCore import QProcess, QProcessEnvironment, QSize
+from PyQt5.QtGui import QImage
+
+
+class Filmstrip:
+    timings = {'accurate': [0, 0.0], 'fast': [0, 0.0]}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def args(source: str, frametimes: List[str], size: QSize, fast: bool=False) -> List[str]:
+        # one input per frame so each gets its own fast input seek, then trim/scale/concat into a raw rgb24 pipe
+        args = ['-hide_banner', '-v', 'error']
+        # fast mode lands on the keyframe before each time and only decodes that, with cheap decode and scaling
+        seekargs = ['-skip_frame', 'nokey', '-skip_loop_filter', 'all', '-flags2', 'fast', '-noaccurate_seek'] \
+            if fast else []
+        for frametime in frametimes:
+            args += ['-an', '-sn'] + seekargs + ['-ss', frametime, '-i', source]
+        graph = ';'.join('[{0}:v:0]trim=end_frame=1,scale={1}:{2}{3},setsar=1[v{0}]'
+                         .format(i, size.width(), size.height(), ':flags=fast_bilinear' if fast else '')
+                         for i in range(len(frametimes)))
+        # renumber pts so the muxer's frame rate handling never drops frames that sat close together in the source
+        graph += ';{0}concat=n={1}:v=1:a=0,settb=1/25,setpts=N[out]' \
+            .format(''.join('[v{}]'.format(i) for i in range(len(frametimes))), len(frametimes))
+        return args + ['-filter_complex', graph, '-map', '[out]', '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-']
+
+    @staticmethod
+    def capture(ffmpeg: str, source: str, frametimes: List[str], size: QSize,
+                callback: Callable[[int, QImage], None]=None, cancelled: Callable[[], bool]=None,
+                fast: bool=False) -> Optional[List[QImage]]:
+        if not len(frametimes):
+            return []
+        logger = logging.getLogger(__name__)
+        started = time.perf_counter()
+        proc = QProcess()
+        proc.setProcessEnvironment(QProcessEnvironment.systemEnvironment())
+        proc.setProcessChannelMode(QProcess.SeparateChannels)
+        proc.start(ffmpeg, Filmstrip.args(source, frametimes, size, fast))
+        framebytes = size.width() * size.height() * 3
+        frames = []
+        # frames leave the concat filter in order, so hand each one over as soon as its bytes are in
+        while True:
+            ready = proc.waitForReadyRead(50 if cancelled is not None else -1)
+            if cancelled is not None and cancelled():
+                proc.kill()
+                proc.waitForFinished(-1)
+                logger.info('filmstrip capture from {0} cancelled after {1} of {2} frames'
+                            .format(source, len(frames), len(frametimes)))
+                return None
+            if not ready and proc.state() != QProcess.NotRunning:
+                continue
+            while proc.bytesAvailable() >= framebytes and len(frames) < len(frametimes):
+                # read() hands back one frame's bytes and QImage wraps them in place, keeping a reference
+                frame = QImage(proc.read(framebytes), size.width(), size.height(), size.width() * 3,
+                               QImage.Format_RGB888)
+                frames.append(frame)
+                if callback is not None:
+                    callback(len(frames) - 1, frame)
+            if not ready:
+                break
+        proc.waitForFinished(-1)
+        if proc.exitStatus() != QProcess.NormalExit or proc.exitCode() != 0 or len(frames) < len(frametimes):
+            logger.error('filmstrip capture of {0} frames from {1} failed: {2}'
+                         .format(len(frametimes), source, proc.readAllStandardError().data().decode().strip()))
+            return None
+        elapsed = (time.perf_counter() - started) * 1000
+        mode = 'fast' if fast else 'accurate'
+        with Filmstrip._lock:
+            Filmstrip.timings[mode][0] += len(frames)
+            Filmstrip.timings[mode][1] += elapsed
+            averages = ', '.join('{0} {1:.1f} ms/frame'.format(name, total / count)
+                                 for name, (count, total) in sorted(Filmstrip.timings.items()) if count)
+        logger.info('{0} filmstrip of {1} frames from {2} took {3:.1f} ms (averages: {4})'
+                    .format(mode, len(frames), source, elapsed, averages))
+        return frames
+
+
+if __name__ == '__main__':
+    # usage: python3 -m vidcutter.libs.filmstrip /path/to/ffmpeg media.file duration_seconds [frames]
+    import os
+    import sys
+    import tempfile
+    from PyQt5.QtCore import QCoreApplication
+    if len(sys.argv) < 4:
+        sys.stderr.write('usage: {} ffmpeg media duration [frames]\n'.format(sys.argv[0]))
+        sys.exit(1)
+    app = QCoreApplication(sys.argv)
+    ffmpeg, media, length = sys.argv[1], sys.argv[2], float(sys.argv[3])
+    count = int(sys.argv[4]) if len(sys.argv) > 4 else 18
+    thumbsize = QSize(106, 60)
+    times = ['{0:.3f}'.format(max(1.0, length * i / count)) for i in range(count)]
+    begin = time.perf_counter()
+    for t in times:
+        # the per-frame path: one ffmpeg, one seek and one jpeg round trip per thumbnail
+        jpeg = os.path.join(tempfile.gettempdir(), 'vidcutter-bench.jpg')
+        QProcess.execute(ffmpeg, ['-hide_banner', '-v', 'error', '-ss', t, '-i', media, '-vframes', '1', '-s',
+                                  '{0}x{1}'.format(thumbsize.width(), thumbsize.height()), '-y', jpeg])
+        QImage(jpeg, 'JPG')
+        os.remove(jpeg)
+    print('{0:<12} {1:8.1f} ms'.format('per-frame', (time.perf_counter() - begin) * 1000))
+    begin = time.perf_counter()
+    strip = Filmstrip.capture(ffmpeg, media, times, thumbsize)
+    print('{0:<12} {1:8.1f} ms  ({2} frames)'.format('filmstrip', (time.perf_counter() - begin) * 1000,
+                                                     len(strip) if strip is not None else 0))
+    begin = time.perf_counter()
+    strip = Filmstrip.capture(ffmpeg, media, times, thumbsize, fast=True)
+    print('{0:<12} {1:8.1f} ms  ({2} frames)'.format('fast', (time.perf_counter() - begin) * 1000,
+                                                     len(strip) if strip is not None else 0))
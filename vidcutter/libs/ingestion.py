@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+import logging
+from typing import List, Tuple
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QObject, QRunnable, QThreadPool, QTime
+from PyQt5.QtGui import QPixmap
+
+from vidcutter.libs.munch import Munch
+from vidcutter.libs.videoservice import VideoService
+
+
+class IngestSignals(QObject):
+    completed = pyqtSignal(int, str, QTime, QPixmap)
+    failed = pyqtSignal(int, str, str)
+
+
+class IngestTask(QRunnable):
+    def __init__(self, service: VideoService, tools: Munch, stream_maps: Tuple[str, str], index: int, media: str,
+                 reference: str, signals: IngestSignals):
+        super(IngestTask, self).__init__()
+        self.service = service
+        self.tools = tools
+        self.stream_maps = stream_maps
+        self.index = index
+        self.media = media
+        self.reference = reference
+        self.signals = signals
+        self.setAutoDelete(True)
+
+    # noinspection PyBroadException
+    def run(self) -> None:
+        try:
+            if self.reference is not None:
+                result, error = self.service.testJoin(self.reference, self.media, self.stream_maps)
+                if not result:
+                    self.signals.failed.emit(self.index, self.media, error)
+                    return
+            duration = self.service.duration(self.media)
+            thumb = VideoService.captureFrame(self.tools, self.media, '00:00:02.000', external=True)
+            self.signals.completed.emit(self.index, self.media, duration, thumb)
+        except Exception:
+            logging.getLogger(__name__).exception('Exception ingesting {}'.format(self.media), exc_info=True)
+            self.signals.failed.emit(self.index, self.media, '')
+
+
+class ClipIngestor(QObject):
+    clipReady = pyqtSignal(int, str, QTime, QPixmap)
+    clipFailed = pyqtSignal(int, str, str)
+    finished = pyqtSignal()
+
+    def __init__(self, service: VideoService, workers: int, parent=None):
+        super(ClipIngestor, self).__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.service = service
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, workers))
+        self.signals = IngestSignals(self)
+        self.signals.completed.connect(self.on_completed)
+        self.signals.failed.connect(self.on_failed)
+        self.pending = 0
+
+    @property
+    def running(self) -> bool:
+        return self.pending > 0
+
+    def start(self, files: List[str], reference: str=None) -> None:
+        if not len(files):
+            return
+        self.pending += len(files)
+        # tool paths and stream selection live on the GUI thread, so the workers get a snapshot taken here
+        tools = VideoService.frameTools(self.service.settings)
+        stream_maps = self.service.parseMappings(True), self.service.parseMappings(False)
+        if reference is None:
+            # first file seeds an empty clip index, the rest are tested against it
+            reference = files[0]
+            self.pool.start(IngestTask(self.service, tools, stream_maps, 0, files[0], None, self.signals))
+            files = files[1:]
+            offset = 1
+        else:
+            offset = 0
+        # warm the summary of the shared reference once rather than in every worker
+        self.service.mediaSummary(reference)
+        for index, file in enumerate(files):
+            self.pool.start(IngestTask(self.service, tools, stream_maps, index + offset, file, reference, self.signals))
+        self.logger.info('ingesting {0} media files with {1} workers'
+                         .format(len(files) + offset, self.pool.maxThreadCount()))
+
+    @pyqtSlot(int, str, QTime, QPixmap)
+    def on_completed(self, index: int, media: str, duration: QTime, thumb: QPixmap) -> None:
+        self.clipReady.emit(index, media, duration, thumb)
+        self.taskDone()
+
+    @pyqtSlot(int, str, str)
+    def on_failed(self, index: int, media: str, error: str) -> None:
+        self.clipFailed.emit(index, media, error)
+        self.taskDone()
+
+    def taskDone(self) -> None:
+        self.pending -= 1
+        if self.pending == 0:
+            self.finished.emit()
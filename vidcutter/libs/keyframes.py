@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+import logging
+import mmap
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_right
+from typing import List, Optional
+
+from PyQt5.QtCore import pyqtSignal, QProcess, QProcessEnvironment, QThread
+
+from vidcutter.libs.containerindex import ContainerIndex
+from vidcutter.libs.mediacache import MediaSignature
+
+
+def _startBackground(program: str, args: List[str]) -> QProcess:
+    # keyframe scans are background work, so their ffprobe runs below the priority of playback and the GUI
+    proc = QProcess()
+    proc.setProcessEnvironment(QProcessEnvironment.systemEnvironment())
+    proc.setProcessChannelMode(QProcess.SeparateChannels)
+    if hasattr(proc, 'setCreateProcessArgumentsModifier'):
+        # windows only: BELOW_NORMAL_PRIORITY_CLASS
+        proc.setCreateProcessArgumentsModifier(lambda cpargs: setattr(cpargs, 'flags', cpargs.flags | 0x00004000))
+    proc.start(program, args)
+    if hasattr(os, 'setpriority') and proc.processId() > 0:
+        try:
+            os.setpriority(os.PRIO_PROCESS, proc.processId(), 10)
+        except OSError:
+            pass
+    return proc
+
+
+class KeyframeIndex:
+    # magic, version, duration, count followed by count float64 pts and count int64 byte positions
+    header = struct.Struct('=4sIdQ')
+    magic = b'VCKF'
+    version = 1
+
+    def __init__(self, source: str, duration: float):
+        self.source = source
+        self.duration = duration
+        self.times = array('d')
+        self.positions = array('q')
+        self.scanned = 0.0
+        self.complete = False
+
+    def add(self, pts: float, pos: int = -1) -> None:
+        # packets arrive in decode order so keyframe pts is almost always increasing
+        if not len(self.times) or pts > self.times[-1]:
+            self.times.append(pts)
+            self.positions.append(pos)
+        elif pts not in self.times:
+            i = bisect_right(self.times, pts)
+            self.times.insert(i, pts)
+            self.positions.insert(i, pos)
+
+    def finalize(self) -> None:
+        if not len(self.times) or self.times[-1] < self.duration:
+            self.times.append(self.duration)
+            self.positions.append(-1)
+        self.scanned = self.duration
+        self.complete = True
+
+    def setDuration(self, duration: float) -> None:
+        # a fast open starts indexing against the bounded probe's duration, the full probe corrects it later
+        if self.complete and len(self.times) and self.positions[-1] == -1 and self.times[-1] == self.duration:
+            self.times.pop()
+            self.positions.pop()
+            self.duration = duration
+            self.finalize()
+        else:
+            self.duration = duration
+
+    @property
+    def progress(self) -> float:
+        if self.complete:
+            return 1.0
+        return min(self.scanned / self.duration, 1.0) if self.duration > 0 else 0.0
+
+    def covers(self, start: float, end: float) -> bool:
+        # bisections treat the last keyframe as the end of file, so a partial index needs two past the clip
+        return self.complete or (self.scanned > end and bisect_right(self.times, end) < len(self.times) - 1)
+
+    def formatted(self) -> List[str]:
+        return [KeyframeIndex.formatTime(pts) for pts in self.times]
+
+    @staticmethod
+    def formatTime(pts: float) -> str:
+        msecs = int(round(pts * 1000))
+        return '{0}:{1:02d}:{2:02d}.{3:03d}'.format(msecs // 3600000, (msecs // 60000) % 60,
+                                                     (msecs // 1000) % 60, msecs % 1000)
+
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as f:
+            f.write(KeyframeIndex.header.pack(KeyframeIndex.magic, KeyframeIndex.version, self.duration,
+                                              len(self.times)))
+            self.times.tofile(f)
+            self.positions.tofile(f)
+
+    @staticmethod
+    def load(path: str, source: str) -> Optional['KeyframeIndex']:
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                magic, version, duration, count = KeyframeIndex.header.unpack_from(mm)
+                offset = KeyframeIndex.header.size
+                if magic != KeyframeIndex.magic or version != KeyframeIndex.version \
+                        or len(mm) != offset + count * 16:
+                    return None
+                index = KeyframeIndex(source, duration)
+                view = memoryview(mm)
+                try:
+                    index.times.frombytes(view[offset:offset + count * 8])
+                    index.positions.frombytes(view[offset + count * 8:])
+                finally:
+                    view.release()
+        index.scanned = duration
+        index.complete = True
+        return index
+
+
+class KeyframeCache:
+    def __init__(self, path: str, maxentries: int = 500, fingerprint: bool = False):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.maxentries = maxentries
+        self.fingerprint = fingerprint
+        if self.enabled:
+            os.makedirs(self.path, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxentries > 0
+
+    def filename(self, source: str) -> Optional[str]:
+        key = MediaSignature.key(source, self.fingerprint)
+        return os.path.join(self.path, '{}.kfi'.format(key)) if key is not None else None
+
+    def get(self, source: str) -> Optional[KeyframeIndex]:
+        if not self.enabled:
+            return None
+        filename = self.filename(source)
+        if filename is None or not os.path.isfile(filename):
+            return None
+        try:
+            started = time.perf_counter()
+            index = KeyframeIndex.load(filename, source)
+            if index is not None:
+                os.utime(filename)
+                self.logger.info('loaded {0} cached keyframes for {1} in {2:.1f} ms'
+                                 .format(len(index.times), source, (time.perf_counter() - started) * 1000))
+            return index
+        except (OSError, ValueError, struct.error):
+            self.logger.exception('Could not load keyframe cache: {}'.format(filename), exc_info=True)
+            return None
+
+    def put(self, index: KeyframeIndex) -> None:
+        if not self.enabled or not index.complete:
+            return
+        filename = self.filename(index.source)
+        if filename is None:
+            return
+        try:
+            index.save(filename)
+            self.evict()
+        except OSError:
+            self.logger.exception('Could not save keyframe cache: {}'.format(filename), exc_info=True)
+
+    def evict(self) -> None:
+        files = [entry for entry in os.scandir(self.path) if entry.name.endswith('.kfi')]
+        if len(files) <= self.maxentries:
+            return
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files) - self.maxentries]:
+            os.remove(entry.path)
+
+    def clear(self) -> None:
+        if os.path.isdir(self.path):
+            [os.remove(entry.path) for entry in os.scandir(self.path) if entry.name.endswith('.kfi')]
+
+
+class KeyframeParser:
+    def __init__(self, index: KeyframeIndex):
+        self.index = index
+        self._buffer = b''
+        self._pts = 0.0
+
+    def feed(self, data: bytes) -> None:
+        lines = (self._buffer + data).split(b'\n')
+        self._buffer = lines.pop()
+        for line in lines:
+            self.parseLine(line)
+
+    def parseLine(self, line: bytes) -> None:
+        # csv=p=0 packet lines look like: 12.345000,48213,K_
+        fields = line.strip().split(b',')
+        if len(fields) < 3:
+            return
+        pts, pos, flags = fields[0], fields[1], fields[2]
+        if pts != b'N/A':
+            try:
+                self._pts = float(pts)
+            except ValueError:
+                return
+            if self._pts > self.index.scanned:
+                self.index.scanned = self._pts
+        if b'K' in flags:
+            self.index.add(self._pts, int(pos) if pos.isdigit() else -1)
+
+    def close(self) -> None:
+        if len(self._buffer):
+            self.parseLine(self._buffer)
+            self._buffer = b''
+        self.index.finalize()
+
+
+class KeyframeIndexer(QThread):
+    progress = pyqtSignal(float)
+
+    def __init__(self, ffprobe: str, index: KeyframeIndex, parent=None, containers: bool = True):
+        super(KeyframeIndexer, self).__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.ffprobe = ffprobe
+        self.index = index
+        self.containers = containers
+        self.failed = False
+
+    def run(self) -> None:
+        started = time.perf_counter()
+        if self.containers and self.readContainerIndex(started):
+            return
+        proc = _startBackground(self.ffprobe, ['-hide_banner', '-v', 'error', '-select_streams', 'v:0', '-show_packets',
+                                               '-show_entries', 'packet=pts_time,pos,flags', '-of', 'csv=p=0',
+                                               self.index.source])
+        if not proc.waitForStarted():
+            self.failed = True
+            self.logger.error('Could not start keyframe indexing: {}'.format(proc.errorString()))
+            return
+        parser = KeyframeParser(self.index)
+        reported = 0
+        while True:
+            if self.isInterruptionRequested():
+                proc.kill()
+                proc.waitForFinished()
+                self.logger.info('keyframe indexing of {0} cancelled at {1:.0%}'
+                                 .format(self.index.source, self.index.progress))
+                return
+            if proc.waitForReadyRead(250):
+                parser.feed(proc.readAllStandardOutput().data())
+                percent = int(self.index.progress * 100)
+                if percent > reported:
+                    reported = percent
+                    self.progress.emit(self.index.progress)
+            elif proc.state() == QProcess.NotRunning:
+                break
+        parser.feed(proc.readAllStandardOutput().data())
+        parser.close()
+        if proc.exitStatus() != QProcess.NormalExit or proc.exitCode() != 0:
+            self.failed = True
+            self.logger.error('keyframe indexing of {0} failed: {1}'
+                              .format(self.index.source, proc.readAllStandardError().data().decode().strip()))
+        self.progress.emit(1.0)
+        self.logger.info('indexed {0} keyframes in {1} via packet scan in {2:.3f} s'
+                         .format(len(self.index.times), self.index.source, time.perf_counter() - started))
+
+    # noinspection PyBroadException
+    def readContainerIndex(self, started: float) -> bool:
+        try:
+            result = ContainerIndex.read(self.index.source)
+        except Exception:
+            self.logger.exception('Could not read container index of {}'.format(self.index.source), exc_info=True)
+            result = None
+        if result is None:
+            self.logger.info('no usable container index in {0}, falling back to packet scan ({1:.3f} s spent)'
+                             .format(self.index.source, time.perf_counter() - started))
+            return False
+        strategy, times, positions = result
+        for pts, pos in sorted(zip(times, positions)):
+            self.index.add(pts, pos)
+        self.index.finalize()
+        self.progress.emit(1.0)
+        self.logger.info('indexed {0} keyframes in {1} via {2} in {3:.3f} s'
+                         .format(len(self.index.times), self.index.source, strategy, time.perf_counter() - started))
+        return True
+
+
+class KeyframeLocator(QThread):
+    def __init__(self, ffprobe: str, source: str, duration: float, timestamps: List[float] = None,
+                 window: float = 10.0, workers: int = 4, parent=None):
+        super(KeyframeLocator, self).__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.ffprobe = ffprobe
+        self.source = source
+        self.duration = duration
+        self.timestamps = timestamps or []
+        self.window = window
+        self.workers = max(1, workers)
+        self.times = array('d')
+
+    def run(self) -> None:
+        # the probes block on their processes so they belong off the GUI thread
+        self.times = self.locate(self.timestamps)
+
+    def probe(self, timestamp: float, window: float) -> QProcess:
+        # ffprobe seeks to the keyframe before the interval start and reads up to its end
+        interval = '{0:.3f}%{1:.3f}'.format(max(timestamp - window, 0), min(timestamp + window, self.duration))
+        return _startBackground(self.ffprobe, ['-hide_banner', '-v', 'error', '-select_streams', 'v:0',
+                                               '-read_intervals', interval, '-show_packets',
+                                               '-show_entries', 'packet=pts_time,pos,flags', '-of', 'csv=p=0',
+                                               self.source])
+
+    def sufficient(self, timestamp: float, window: float, times: array) -> bool:
+        # a start needs one keyframe before and two after, an end two before and one after
+        before = bisect_right(times, timestamp - 0.000001)
+        after = len(times) - before
+        return (before >= 2 or timestamp - window <= 0) and (after >= 2 or timestamp + window >= self.duration)
+
+    def locate(self, timestamps: List[float]) -> array:
+        started = time.perf_counter()
+        pending = [(timestamp, self.window) for timestamp in sorted(set(timestamps))]
+        running, found, probes = [], set(), 0
+        while len(pending) or len(running):
+            while len(pending) and len(running) < self.workers:
+                timestamp, window = pending.pop(0)
+                running.append((timestamp, window, self.probe(timestamp, window)))
+                probes += 1
+            timestamp, window, proc = running.pop(0)
+            proc.waitForFinished(-1)
+            index = KeyframeIndex(self.source, self.duration)
+            KeyframeParser(index).feed(proc.readAllStandardOutput().data() + b'\n')
+            found.update(index.times)
+            if not self.sufficient(timestamp, window, index.times) and window < self.duration:
+                pending.append((timestamp, window * 2))
+        times = array('d', sorted(found))
+        if not len(times) or times[-1] < self.duration:
+            times.append(self.duration)
+        self.logger.info('located {0} keyframes around {1} timestamps in {2} with {3} windowed probes in {4:.3f} s'
+                         .format(len(times), len(timestamps), self.source, probes, time.perf_counter() - started))
+        return times
+
+
+if __name__ == '__main__':
+    # usage: python3 -m vidcutter.libs.keyframes /path/to/ffprobe media.file seconds [seconds ...]
+    import subprocess
+    import sys
+    if len(sys.argv) < 4:
+        sys.stderr.write('usage: {} ffprobe media seconds [seconds ...]\n'.format(sys.argv[0]))
+        sys.exit(1)
+    ffprobe, media, points = sys.argv[1], sys.argv[2], [float(arg) for arg in sys.argv[3:]]
+    length = float(subprocess.check_output([ffprobe, '-v', 'error', '-show_entries', 'format=duration',
+                                            '-of', 'csv=p=0', media]).decode().strip())
+    for name, containers in (('container index', True), ('packet scan', False)):
+        begin = time.perf_counter()
+        full = KeyframeIndex(media, length)
+        KeyframeIndexer(ffprobe, full, containers=containers).run()
+        print('{0:<16} {1:8.3f} s  {2} keyframes'.format(name, time.perf_counter() - begin, len(full.times)))
+    begin = time.perf_counter()
+    local = KeyframeLocator(ffprobe, media, length, workers=QThread.idealThreadCount()).locate(points)
+    print('{0:<16} {1:8.3f} s  {2} keyframes'.format('boundary windows', time.perf_counter() - begin, len(local)))
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from vidcutter.libs.munch import Munch
+
+
+class MediaSignature:
+    fingerprint_bytes = 65536
+
+    @staticmethod
+    def get(source: str, fingerprint: bool=False) -> Optional[tuple]:
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return None
+        digest = MediaSignature.fingerprint(source, stat.st_size) if fingerprint else ''
+        return os.path.realpath(source), stat.st_size, stat.st_mtime, digest
+
+    @staticmethod
+    def fingerprint(source: str, size: int) -> str:
+        # sample head + tail of the file only, cheap enough for NAS mounted media
+        sha1 = hashlib.sha1()
+        try:
+            with open(source, 'rb') as f:
+                sha1.update(f.read(MediaSignature.fingerprint_bytes))
+                if size > MediaSignature.fingerprint_bytes * 2:
+                    f.seek(-MediaSignature.fingerprint_bytes, os.SEEK_END)
+                    sha1.update(f.read(MediaSignature.fingerprint_bytes))
+        except OSError:
+            return ''
+        return sha1.hexdigest()
+
+    @staticmethod
+    def key(source: str, fingerprint: bool=False) -> Optional[str]:
+        signature = MediaSignature.get(source, fingerprint)
+        if signature is None:
+            return None
+        return hashlib.sha1('{0}|{1}|{2}|{3}'.format(*signature).encode()).hexdigest()
+
+
+class ProbeCache:
+    def __init__(self, path: str, maxentries: int=500, maxage: int=30, fingerprint: bool=False):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.maxentries = maxentries
+        self.maxage = maxage
+        self.fingerprint = fingerprint
+        self.stats = Munch(hits=0, misses=0, evictions=0)
+        self._lock = threading.Lock()
+        self._db = None
+        if self.maxentries <= 0:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS probes (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, '
+                             'fingerprint TEXT, accessed REAL, data TEXT)')
+            self._db.commit()
+            self.evict()
+        except sqlite3.Error:
+            self.logger.exception('Could not open probe cache: {}'.format(self.path), exc_info=True)
+            self._db = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    def get(self, source: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        signature = MediaSignature.get(source, self.fingerprint)
+        data = None
+        if signature is not None:
+            path, size, mtime, digest = signature
+            with self._lock:
+                try:
+                    row = self._db.execute('SELECT size, mtime, fingerprint, data FROM probes WHERE path = ?',
+                                           (path,)).fetchone()
+                    if row is not None and row[0] == size and row[1] == mtime and row[2] == digest:
+                        data = row[3]
+                        self._db.execute('UPDATE probes SET accessed = ? WHERE path = ?', (time.time(), path))
+                        self._db.commit()
+                except sqlite3.Error:
+                    self.logger.exception('Probe cache lookup failed', exc_info=True)
+        if data is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        if os.getenv('DEBUG', False):
+            self.logger.info('probe cache {0}: {1} (hits={2}, misses={3}, evictions={4})'
+                             .format('hit' if data is not None else 'miss', source, self.stats.hits,
+                                     self.stats.misses, self.stats.evictions))
+        return data
+
+    def put(self, source: str, data: str) -> None:
+        if not self.enabled or not len(data):
+            return
+        signature = MediaSignature.get(source, self.fingerprint)
+        if signature is None:
+            return
+        with self._lock:
+            try:
+                self._db.execute('INSERT OR REPLACE INTO probes VALUES (?, ?, ?, ?, ?, ?)',
+                                 signature + (time.time(), data))
+                self._db.commit()
+            except sqlite3.Error:
+                self.logger.exception('Probe cache update failed', exc_info=True)
+                return
+        self.evict()
+
+    def evict(self) -> int:
+        if not self.enabled:
+            return 0
+        evicted = 0
+        with self._lock:
+            try:
+                if self.maxage > 0:
+                    cursor = self._db.execute('DELETE FROM probes WHERE accessed < ?',
+                                              (time.time() - (self.maxage * 86400),))
+                    evicted += cursor.rowcount
+                cursor = self._db.execute('DELETE FROM probes WHERE path NOT IN (SELECT path FROM probes '
+                                          'ORDER BY accessed DESC LIMIT ?)', (self.maxentries,))
+                evicted += cursor.rowcount
+                self._db.commit()
+            except sqlite3.Error:
+                self.logger.exception('Probe cache eviction failed', exc_info=True)
+        self.stats.evictions += evicted
+        return evicted
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            try:
+                self._db.execute('DELETE FROM probes')
+                self._db.commit()
+            except sqlite3.Error:
+                self.logger.exception('Could not clear probe cache', exc_info=True)
+
+    def count(self) -> int:
+        if not self.enabled:
+            return 0
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM probes').fetchone()[0]
+
+    def close(self) -> None:
+        if self.enabled:
+            with self._lock:
+                self._db.close()
+                self._db = None
+
+
+class ThumbnailCache:
+    def __init__(self, path: str, maxbytes: int=256 * 1024 * 1024, fingerprint: bool=False):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.maxbytes = maxbytes
+        self.fingerprint = fingerprint
+        self.stats = Munch(hits=0, misses=0, evictions=0)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        if not self.enabled:
+            return
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            self._bytes = sum(entry.stat().st_size for entry in self._entries())
+            self.evict()
+        except OSError:
+            self.logger.exception('Could not open thumbnail cache: {}'.format(self.path), exc_info=True)
+            self.maxbytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxbytes > 0
+
+    def _entries(self) -> list:
+        return [entry for entry in os.scandir(self.path) if entry.name.endswith('.jpg')]
+
+    def mediaKey(self, source: str) -> Optional[str]:
+        return MediaSignature.key(source, self.fingerprint) if self.enabled else None
+
+    @staticmethod
+    def key(mediakey: str, frametime: str, width: int, height: int, external: bool=False, fast: bool=False) -> str:
+        return hashlib.sha1('{0}|{1}|{2}x{3}|{4:d}{5}'.format(mediakey, frametime, width, height, external,
+                                                               '|fast' if fast else '').encode()).hexdigest()
+
+    def filename(self, key: str) -> str:
+        return os.path.join(self.path, '{}.jpg'.format(key))
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        data = None
+        try:
+            with open(self.filename(key), 'rb') as f:
+                data = f.read()
+            # mtime doubles as the last access time for LRU eviction
+            os.utime(self.filename(key))
+        except OSError:
+            pass
+        with self._lock:
+            if data is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if not self.enabled or not len(data):
+            return
+        filename = self.filename(key)
+        try:
+            previous = os.path.getsize(filename) if os.path.isfile(filename) else 0
+            # write then rename so concurrent workers never read a half written image
+            partial = '{0}.{1}.tmp'.format(filename, threading.get_ident())
+            with open(partial, 'wb') as f:
+                f.write(data)
+            os.replace(partial, filename)
+        except OSError:
+            self.logger.exception('Thumbnail cache update failed', exc_info=True)
+            return
+        with self._lock:
+            self._bytes += len(data) - previous
+            overbudget = self._bytes > self.maxbytes
+        if overbudget:
+            self.evict()
+
+    def evict(self) -> int:
+        if not self.enabled:
+            return 0
+        evicted = 0
+        with self._lock:
+            try:
+                entries = sorted(((entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                                  for entry in self._entries()), reverse=True)
+                total = sum(entry[1] for entry in entries)
+                # trim to 90% of the budget so a full cache doesn't rescan on every insert
+                while len(entries) and total > self.maxbytes * 0.9:
+                    _, size, path = entries.pop()
+                    os.remove(path)
+                    total -= size
+                    evicted += 1
+                self._bytes = total
+            except OSError:
+                self.logger.exception('Thumbnail cache eviction failed', exc_info=True)
+            self.stats.evictions += evicted
+        return evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            try:
+                if os.path.isdir(self.path):
+                    [os.remove(entry.path) for entry in self._entries()]
+            except OSError:
+                self.logger.exception('Could not clear thumbnail cache', exc_info=True)
+            self._bytes = 0
+
+    def count(self) -> int:
+        return len(self._entries()) if self.enabled and os.path.isdir(self.path) else 0
+
+    def size(self) -> int:
+        return self._bytes
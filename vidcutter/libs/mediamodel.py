@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+import sys
+from typing import List, Optional
+
+try:
+    # noinspection PyPackageRequirements
+    from simplejson import loads
+except ImportError:
+    from json import loads
+
+
+def _int(value, default: int=0) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _float(value, default: float=0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _rate(value: str) -> float:
+    try:
+        num, den = value.split('/')
+        return int(num) / int(den) if int(den) else 0.0
+    except (AttributeError, ValueError):
+        return _float(value)
+
+
+class MediaStream:
+    __slots__ = ('index', 'codec_type', 'codec_name', 'codec_long_name', 'width', 'height', 'pix_fmt',
+                 'avg_frame_rate', 'frame_rate', 'display_aspect_ratio', 'sample_rate', 'channels', 'bit_rate',
+                 'duration', 'tags')
+
+    def __init__(self, data: dict):
+        self.index = _int(data.get('index'))
+        self.codec_type = data.get('codec_type', '')
+        self.codec_name = data.get('codec_name', '')
+        self.codec_long_name = data.get('codec_long_name', '')
+        self.width = _int(data.get('width'))
+        self.height = _int(data.get('height'))
+        self.pix_fmt = data.get('pix_fmt', '')
+        self.avg_frame_rate = data.get('avg_frame_rate', '0/0')
+        self.frame_rate = _rate(self.avg_frame_rate)
+        self.display_aspect_ratio = data.get('display_aspect_ratio', '')
+        self.sample_rate = _int(data.get('sample_rate'))
+        self.channels = _int(data.get('channels'))
+        self.bit_rate = _int(data.get('bit_rate'))
+        self.duration = _float(data.get('duration'))
+        self.tags = data.get('tags', {})
+
+    @property
+    def aspect_ratio(self) -> float:
+        num, _, den = self.display_aspect_ratio.partition(':')
+        if _int(num) and _int(den):
+            return _int(num) / _int(den)
+        return self.width / self.height if self.height else 0.0
+
+    def __repr__(self) -> str:
+        return '{0}({1})'.format(type(self).__name__,
+                                 ', '.join('{0}={1!r}'.format(s, getattr(self, s)) for s in self.__slots__))
+
+
+class MediaFormat:
+    __slots__ = ('filename', 'format_name', 'format_long_name', 'duration', 'size', 'bit_rate', 'nb_streams', 'tags',
+                 'streams', 'video', 'audio', 'subtitle', 'partial')
+
+    def __init__(self, data: dict, partial: bool=False):
+        # partial models come from a bounded probe of the first video stream only
+        self.partial = partial
+        fmt = data.get('format', {})
+        self.filename = fmt.get('filename', '')
+        self.format_name = fmt.get('format_name', '')
+        self.format_long_name = fmt.get('format_long_name', '')
+        self.size = _int(fmt.get('size'))
+        self.bit_rate = _int(fmt.get('bit_rate'))
+        self.tags = fmt.get('tags', {})
+        self.streams, self.video, self.audio, self.subtitle = [], [], [], []
+        buckets = {'video': self.video, 'audio': self.audio, 'subtitle': self.subtitle}
+        for item in data.get('streams', []):
+            stream = MediaStream(item)
+            self.streams.append(stream)
+            bucket = buckets.get(stream.codec_type)
+            if bucket is not None:
+                bucket.append(stream)
+        self.nb_streams = _int(fmt.get('nb_streams'), len(self.streams))
+        self.duration = _float(fmt.get('duration'), self.video[0].duration if len(self.video) else 0.0)
+
+    @staticmethod
+    def fromJSON(json_data: str, partial: bool=False) -> 'MediaFormat':
+        return MediaFormat(loads(json_data), partial)
+
+    def __repr__(self) -> str:
+        return '{0}({1})'.format(type(self).__name__,
+                                 ', '.join('{0}={1!r}'.format(s, getattr(self, s)) for s in self.__slots__))
+
+
+class MediaStreams:
+    __slots__ = ('video', 'audio', 'subtitle')
+
+    def __init__(self, media: Optional[MediaFormat]=None):
+        # we always assume one video stream per media file
+        self.video = media.video[0] if media is not None and len(media.video) else None
+        self.audio = media.audio if media is not None else []
+        self.subtitle = media.subtitle if media is not None else []
+
+    def __bool__(self) -> bool:
+        return self.video is not None
+
+
+def benchmark(json_data: str, iterations: int=1000) -> List[str]:
+    import timeit
+    import tracemalloc
+    from vidcutter.libs.config import Streams
+    from vidcutter.libs.munch import Munch
+
+    def munch_path():
+        media = Munch.fromDict(loads(json_data))
+        streams = Munch()
+        for codec_type in Streams.__members__:
+            setattr(streams, codec_type.lower(),
+                    [stream for stream in media.streams if stream.codec_type == codec_type.lower()])
+        return media, streams
+
+    def model_path():
+        media = MediaFormat.fromJSON(json_data)
+        return media, MediaStreams(media)
+
+    results = []
+    for name, func in (('Munch', munch_path), ('MediaFormat', model_path)):
+        elapsed = timeit.timeit(func, number=iterations) / iterations
+        tracemalloc.start()
+        retained = func()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del retained
+        results.append('{0:<12} build {1:8.1f} µs   retained {2:8.1f} KB   peak {3:8.1f} KB'
+                       .format(name, elapsed * 1000000, current / 1024, peak / 1024))
+    return results
+
+
+if __name__ == '__main__':
+    # usage: ffprobe -v error -show_streams -show_format -of json FILE > probe.json
+    #        python3 -m vidcutter.libs.mediamodel probe.json [iterations]
+    if len(sys.argv) < 2:
+        sys.stderr.write('usage: {} probe.json [iterations]\n'.format(sys.argv[0]))
+        sys.exit(1)
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        data = f.read()
+    for line in benchmark(data, int(sys.argv[2]) if len(sys.argv) > 2 else 1000):
+        print(line)
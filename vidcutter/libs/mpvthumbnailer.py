@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+import locale
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from PyQt5.QtCore import QDir, QSize, Qt, QTemporaryDir
+from PyQt5.QtGui import QImage
+
+try:
+    import vidcutter.libs.mpv as mpv
+except ImportError:
+    mpv = None
+
+
+class MpvThumbnailer:
+    # headless libmpv context kept open on the last requested media file; whether that beats spawning ffmpeg per
+    # frame has not been measured yet, see the benchmark below
+    instance = None
+    _lock = threading.Lock()
+
+    options = {
+        'config': 'no',
+        'vo': 'null',
+        'ao': 'null',
+        'aid': 'no',
+        'sid': 'no',
+        'pause': 'yes',
+        'idle': 'yes',
+        'keep-open': 'always',
+        'hr-seek': 'yes',
+        'load-scripts': 'no',
+        'ytdl': 'no',
+        'input-default-bindings': 'no',
+        'screenshot-format': 'png',
+        'screenshot-png-compression': '0',
+        'hwdec': 'no'
+    }
+    timeout = 10.0
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.source = None
+        locale.setlocale(locale.LC_NUMERIC, 'C')
+        self.mpv = mpv.Context()
+        for option, value in MpvThumbnailer.options.items():
+            try:
+                self.mpv.set_option(option, value)
+            except mpv.MPVError:
+                self.logger.warning('error setting MPV option "{0}" to value "{1}"'.format(option, value))
+        self.mpv.initialize()
+        self.tempdir = QTemporaryDir(os.path.join(QDir.tempPath(), 'vidcutter-mpv-XXXXXX'))
+        self.imagecap = os.path.join(self.tempdir.path(), 'grab.png')
+
+    @staticmethod
+    def available() -> bool:
+        return mpv is not None
+
+    @staticmethod
+    def get() -> Optional['MpvThumbnailer']:
+        if mpv is None:
+            return None
+        with MpvThumbnailer._lock:
+            if MpvThumbnailer.instance is None:
+                try:
+                    MpvThumbnailer.instance = MpvThumbnailer()
+                except mpv.MPVError:
+                    logging.getLogger(__name__).exception('Could not start headless mpv thumbnailer', exc_info=True)
+                    return None
+            return MpvThumbnailer.instance
+
+    @staticmethod
+    def seconds(frametime: str) -> float:
+        hours, minutes, seconds = frametime.split(':')
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    def drain(self) -> None:
+        while self.mpv.wait_event(0).id != mpv.Events.none:
+            pass
+
+    def waitFor(self, *events, ignore: frozenset=frozenset()) -> bool:
+        deadline = time.perf_counter() + MpvThumbnailer.timeout
+        while time.perf_counter() < deadline:
+            event = self.mpv.wait_event(.5)
+            if event.id in events:
+                return True
+            if event.id in {mpv.Events.end_file, mpv.Events.shutdown} and event.id not in ignore:
+                return False
+        return False
+
+    def open(self, source: str) -> bool:
+        if source == self.source:
+            return True
+        self.source = None
+        # stale events from an earlier grab must not satisfy the waits below
+        self.drain()
+        self.mpv.command('loadfile', source, 'replace')
+        # replacing a loaded file ends it before the new one starts, so only an end_file after start_file fails;
+        # the initial restart is swallowed too, otherwise the first seek would return before its frame is decoded
+        if not self.waitFor(mpv.Events.start_file, ignore=frozenset({mpv.Events.end_file})) \
+                or not self.waitFor(mpv.Events.file_loaded) or not self.waitFor(mpv.Events.playback_restart):
+            self.logger.error('headless mpv could not load {}'.format(source))
+            return False
+        self.source = source
+        return True
+
+    def grab(self, source: str, frametime: str, size: QSize) -> Optional[QImage]:
+        with MpvThumbnailer._lock:
+            try:
+                if not self.open(source):
+                    return None
+                self.drain()
+                self.mpv.command('seek', MpvThumbnailer.seconds(frametime), 'absolute+exact')
+                if not self.waitFor(mpv.Events.playback_restart):
+                    return None
+                # the bundled binding drops MPV_FORMAT_BYTE_ARRAY nodes so screenshot-raw pixels never reach
+                # python; an uncompressed png in a private temp dir is the cheapest way out of the context
+                self.mpv.command('screenshot-to-file', self.imagecap, 'video')
+                image = QImage(self.imagecap, 'PNG')
+                if image.isNull():
+                    return None
+                return image.scaled(size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation) \
+                    .convertToFormat(QImage.Format_RGB888)
+            except mpv.MPVError:
+                self.logger.exception('headless mpv grab of {0} at {1} failed'.format(source, frametime),
+                                      exc_info=True)
+                self.source = None
+                return None
+
+    @staticmethod
+    def shutdown() -> None:
+        with MpvThumbnailer._lock:
+            if MpvThumbnailer.instance is not None:
+                MpvThumbnailer.instance.mpv.shutdown()
+                MpvThumbnailer.instance.tempdir.remove()
+                MpvThumbnailer.instance = None
+
+
+if __name__ == '__main__':
+    # usage: python3 -m vidcutter.libs.mpvthumbnailer /path/to/ffmpeg media.file duration_seconds [frames]
+    import sys
+    from PyQt5.QtCore import QCoreApplication
+    from vidcutter.libs.filmstrip import Filmstrip
+    if len(sys.argv) < 4:
+        sys.stderr.write('usage: {} ffmpeg media duration [frames]\n'.format(sys.argv[0]))
+        sys.exit(1)
+    if not MpvThumbnailer.available():
+        sys.stderr.write('libmpv bindings (vidcutter.libs.mpv) are not built\n')
+        sys.exit(1)
+    app = QCoreApplication(sys.argv)
+    ffmpeg, media, length = sys.argv[1], sys.argv[2], float(sys.argv[3])
+    count = int(sys.argv[4]) if len(sys.argv) > 4 else 18
+    thumbsize = QSize(100, 70)
+    times = ['{0:02d}:{1:02d}:{2:06.3f}'.format(int(t // 3600), int(t % 3600 // 60), t % 60)
+             for t in (max(1.0, length * i / count) for i in range(count))]
+    begin = time.perf_counter()
+    [Filmstrip.capture(ffmpeg, media, [t], thumbsize) for t in times]
+    spawn = (time.perf_counter() - begin) * 1000 / count
+    thumbnailer = MpvThumbnailer.get()
+    begin = time.perf_counter()
+    thumbnailer.open(media)
+    opened = (time.perf_counter() - begin) * 1000
+    begin = time.perf_counter()
+    grabs = [thumbnailer.grab(media, t, thumbsize) for t in times]
+    served = (time.perf_counter() - begin) * 1000 / count
+    print('{0:<16} {1:8.1f} ms/thumbnail'.format('ffmpeg spawn', spawn))
+    print('{0:<16} {1:8.1f} ms/thumbnail  (+{2:.1f} ms to open, {3} of {4} frames)'
+          .format('headless mpv', served, opened, len([g for g in grabs if g is not None]), count))
+    MpvThumbnailer.shutdown()
@@ -56,8 +56,8 @@ else:
     from OpenGL.platform import PLATFORM
     from ctypes import c_char_p, c_void_p
 
-from PyQt5.QtCore import pyqtSignal, pyqtSlot, Qt, QEvent, QTimer
-from PyQt5.QtGui import QKeyEvent, QMouseEvent, QWheelEvent
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, Qt, QDir, QEvent, QSize, QTemporaryDir, QTimer
+from PyQt5.QtGui import QImage, QKeyEvent, QMouseEvent, QWheelEvent
 from PyQt5.QtWidgets import QOpenGLWidget
 
 import vidcutter.libs.mpv as mpv
@@ -92,6 +92,7 @@ class mpvWidget(QOpenGLWidget):
         self.mpvError = mpv.MPVError
         self.originalParent = None
         self.opengl = None
+        self.grabdir = None
         self.logger = logging.getLogger(__name__)
         locale.setlocale(locale.LC_NUMERIC, 'C')
 
@@ -221,6 +222,22 @@ class mpvWidget(QOpenGLWidget):
         if os.path.isfile(filepath):
             self.mpv.command('loadfile', filepath, 'replace')
 
+    def grabFrame(self, size: QSize) -> QImage:
+        # the frame on screen is already decoded; screenshot-raw is out of reach through the bundled binding
+        # (it drops byte array nodes) so write it out as a jpeg, the quickest format mpv encodes
+        if self.grabdir is None:
+            self.grabdir = QTemporaryDir(os.path.join(QDir.tempPath(), 'vidcutter-grab-XXXXXX'))
+        grabfile = os.path.join(self.grabdir.path(), 'frame.jpg')
+        try:
+            self.mpv.command('screenshot-to-file', grabfile, 'video')
+        except mpv.MPVError:
+            self.logger.exception('Could not grab the current frame from the player', exc_info=True)
+            return QImage()
+        image = QImage(grabfile, 'JPG')
+        if image.isNull():
+            return image
+        return image.scaled(size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+
     def frameStep(self) -> None:
         self.mpv.command('frame-step')
 
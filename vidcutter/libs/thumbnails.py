@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+import logging
+import math
+from typing import Callable, List, Optional
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QObject, QRunnable, QSettings, QSize, QThreadPool
+from PyQt5.QtGui import QPixmap
+
+from vidcutter.libs.munch import Munch
+from vidcutter.libs.videoservice import VideoService
+
+
+class ThumbnailSignals(QObject):
+    captured = pyqtSignal(int, int, QPixmap)
+    done = pyqtSignal(int)
+
+
+class ThumbnailTask(QRunnable):
+    def __init__(self, tools: Munch, job: int, slots: List[int], source: str, frametimes: List[str],
+                 size: QSize, external: bool, fast: bool, cancelled: Callable[[int], bool], signals: ThumbnailSignals):
+        super(ThumbnailTask, self).__init__()
+        self.tools = tools
+        self.job = job
+        self.slots = slots
+        self.source = source
+        self.frametimes = frametimes
+        self.size = size
+        self.external = external
+        self.fast = fast
+        self.cancelled = cancelled
+        self.signals = signals
+        self.setAutoDelete(True)
+
+    def isCancelled(self) -> bool:
+        return self.cancelled(self.job)
+
+    def deliver(self, pos: int, frame: QPixmap) -> None:
+        if not self.isCancelled() and not frame.isNull():
+            self.signals.captured.emit(self.job, self.slots[pos], frame)
+
+    # noinspection PyBroadException
+    def run(self) -> None:
+        try:
+            if not self.isCancelled():
+                if len(self.frametimes) == 1 and not self.fast:
+                    self.deliver(0, VideoService.captureFrame(self.tools, self.source, self.frametimes[0],
+                                                              self.size, self.external, self.isCancelled))
+                else:
+                    VideoService.captureFrames(self.tools, self.source, self.frametimes, self.size, self.deliver,
+                                               self.isCancelled, self.fast)
+        except Exception:
+            logging.getLogger(__name__).exception('Exception capturing thumbnails from {}'.format(self.source),
+                                                  exc_info=True)
+        finally:
+            self.signals.done.emit(self.job)
+
+
+class ThumbnailScheduler(QObject):
+    frameReady = pyqtSignal(int, int, QPixmap)
+    jobFinished = pyqtSignal(int)
+
+    # clip index images are waited on by the user, timeline strips are next, bulk scene images go last
+    INDEX_PRIORITY = 1000
+    TIMELINE_PRIORITY = 500
+    SCENES_PRIORITY = 0
+
+    # every input of a filmstrip is its own demuxer and decoder inside one ffmpeg process, so batches stay small
+    # and long jobs simply queue more of them
+    BATCH_INPUTS = 8
+
+    def __init__(self, settings: QSettings, workers: int, parent=None):
+        super(ThumbnailScheduler, self).__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.settings = settings
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, workers))
+        self.signals = ThumbnailSignals(self)
+        self.signals.captured.connect(self.on_captured)
+        self.signals.done.connect(self.on_done)
+        self.pending = {}
+        self.cancelled = set()
+        self.lastjob, self.horizon = 0, 0
+
+    def submit(self, source: str, frametimes: List[str], size: QSize=None, priority: int=0, external: bool=False,
+               batched: bool=False, focus: Optional[int]=None, fast: bool=False) -> int:
+        self.lastjob += 1
+        job = self.lastjob
+        if not len(frametimes):
+            self.jobFinished.emit(job)
+            return job
+        # batched jobs spread over the workers as filmstrips of at most BATCH_INPUTS frames, otherwise one task
+        # per frame
+        chunksize = 1
+        if batched:
+            chunksize = min(int(math.ceil(len(frametimes) / self.pool.maxThreadCount())), self.BATCH_INPUTS)
+        slots = list(range(len(frametimes)))
+        batches = [slots[i:i + chunksize] for i in range(0, len(slots), chunksize)]
+        self.pending[job] = len(batches)
+        tools = VideoService.frameTools(self.settings)
+        for batch in batches:
+            # work nearest the focused slot (ie. the current view) jumps ahead within its priority band
+            boost = len(frametimes) - min(abs(slot - focus) for slot in batch) if focus is not None else 0
+            self.pool.start(ThumbnailTask(tools, job, batch, source, [frametimes[s] for s in batch], size,
+                                          external, fast, self.isCancelled, self.signals), priority + boost)
+        self.logger.info('thumbnail job {0}: {1} frames in {2} tasks at priority {3} ({4} workers)'
+                         .format(job, len(frametimes), len(batches), priority, self.pool.maxThreadCount()))
+        return job
+
+    def cancel(self, job: int) -> None:
+        if job in self.pending:
+            self.cancelled.add(job)
+            self.logger.info('thumbnail job {} cancelled'.format(job))
+
+    def isCancelled(self, job: int) -> bool:
+        return job <= self.horizon or job in self.cancelled
+
+    def cancelAll(self) -> None:
+        # queued tasks are dropped without ever reporting done, so forget every job issued so far in one go;
+        # tasks still running see themselves cancelled through the horizon
+        self.horizon = self.lastjob
+        self.pool.clear()
+        self.pending.clear()
+        self.cancelled.clear()
+
+    @pyqtSlot(int, int, QPixmap)
+    def on_captured(self, job: int, slot: int, frame: QPixmap) -> None:
+        if not self.isCancelled(job):
+            self.frameReady.emit(job, slot, frame)
+
+    @pyqtSlot(int)
+    def on_done(self, job: int) -> None:
+        if job not in self.pending:
+            return
+        self.pending[job] -= 1
+        if self.pending[job] == 0:
+            del self.pending[job]
+            if job in self.cancelled:
+                self.cancelled.discard(job)
+            else:
+                self.jobFinished.emit(job)
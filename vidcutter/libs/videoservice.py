@@ -28,25 +28,33 @@ import os
 import re
 import shlex
 import sys
-from bisect import bisect_left
+import time
+from array import array
+from bisect import bisect_left, bisect_right
 from functools import partial
-from typing import List, Optional, Union
+from typing import Callable, List, Optional, Tuple, Union
 
-from PyQt5.QtCore import (pyqtSignal, pyqtSlot, QDir, QFileInfo, QObject, QProcess, QProcessEnvironment, QSettings,
-                          QSize, QStandardPaths, QStorageInfo, QTemporaryFile, QTime)
-from PyQt5.QtGui import QPainter, QPixmap
+from PyQt5.QtCore import (pyqtSignal, pyqtSlot, QBuffer, QByteArray, QCoreApplication, QDir, QEventLoop, QFileInfo,
+                          QIODevice, QObject, QProcess, QProcessEnvironment, QSettings, QSize, QStandardPaths,
+                          QStorageInfo, QTemporaryFile, QThread, QTime)
+from PyQt5.QtGui import QImage, QPainter, QPixmap
 from PyQt5.QtWidgets import QMessageBox, QWidget
 
-from vidcutter.libs.config import Config, InvalidMediaException, Streams, ToolNotFoundException
+from vidcutter.libs.config import Config, InvalidMediaException, ToolNotFoundException
 from vidcutter.libs.ffmetadata import FFMetadata
+from vidcutter.libs.filmstrip import Filmstrip
+from vidcutter.libs.keyframes import KeyframeCache, KeyframeIndex, KeyframeIndexer, KeyframeLocator
+from vidcutter.libs.mediacache import MediaSignature, ProbeCache, ThumbnailCache
+from vidcutter.libs.mediamodel import MediaFormat, MediaStreams
+from vidcutter.libs.mpvthumbnailer import MpvThumbnailer
 from vidcutter.libs.munch import Munch
 from vidcutter.libs.widgets import VCMessageBox
 
 try:
     # noinspection PyPackageRequirements
-    from simplejson import loads, JSONDecodeError
+    from simplejson import JSONDecodeError
 except ImportError:
-    from json import loads, JSONDecodeError
+    from json import JSONDecodeError
 
 
 class VideoService(QObject):
@@ -54,11 +62,16 @@ class VideoService(QObject):
     finished = pyqtSignal(bool, str)
     error = pyqtSignal(str)
     addScenes = pyqtSignal(list)
+    mediaProbed = pyqtSignal()
+    keyframesProgress = pyqtSignal(float)
 
     frozen = getattr(sys, 'frozen', False)
     spaceWarningThreshold = 200
+    fastProbeSize = 1000000
+    fastProbeDuration = 1000000
     spaceWarningDelivered = False
     smartcutError = False
+    thumbcache = None
 
     config = Config()
 
@@ -72,33 +85,41 @@ class VideoService(QObject):
             self.proc = VideoService.initProc()
             if hasattr(self.proc, 'errorOccurred'):
                 self.proc.errorOccurred.connect(self.cmdError)
-            self.lastError = ''
             self.media, self.source = None, None
             self.chapter_metadata = None
-            self.keyframes = []
-            self.streams = Munch()
+            self.probeproc = None
+            self.keyframeIndexes = {}
+            self.keyframeIndexers = {}
+            self.keyframeLookup = self.settings.value('keyframeLookup', 'index', type=str)
+            self.boundaryKeyframes, self.boundaryTimes = {}, {}
+            self.streams = MediaStreams()
             self.mappings = []
+            self.summaries = {}
+            self.probecache = ProbeCache(
+                os.path.join(os.path.dirname(self.settings.fileName()), 'probecache.db'),
+                maxentries=self.settings.value('probeCacheEntries', 500, type=int),
+                maxage=self.settings.value('probeCacheMaxAge', 30, type=int),
+                fingerprint=self.settings.value('probeCacheFingerprint', 'off', type=str) in {'on', 'true'})
+            self.keyframeCache = KeyframeCache(
+                os.path.join(os.path.dirname(self.settings.fileName()), 'keyframes'),
+                maxentries=self.probecache.maxentries,
+                fingerprint=self.probecache.fingerprint)
+            VideoService.thumbnailCache(self.settings)
         except ToolNotFoundException as e:
             self.logger.exception(e.msg, exc_info=True)
             QMessageBox.critical(getattr(self, 'parent', None), 'Missing libraries', e.msg)
 
-    def setMedia(self, source: str) -> None:
+    def setMedia(self, source: str, fast: bool=False) -> None:
         try:
+            self.killProbeProc()
+            self.cancelKeyframes()
             self.source = QDir.toNativeSeparators(source)
-            self.media = self.probe(source)
-            if self.media is not None:
-                if getattr(self.parent, 'verboseLogs', False):
-                    self.logger.info(self.media)
-                for codec_type in Streams.__members__:
-                    setattr(self.streams, codec_type.lower(),
-                            [stream for stream in self.media.streams if stream.codec_type == codec_type.lower()])
-                if len(self.streams.video):
-                    self.streams.video = self.streams.video[0]  # we always assume one video stream per media file
-                else:
-                    raise InvalidMediaException('Could not load video stream for {}'.format(source))
-                self.mappings.clear()
-                # noinspection PyUnusedLocal
-                [self.mappings.append(True) for i in range(int(self.media.format.nb_streams))]
+            media = self.probe(source, fast)
+            if media.partial and not len(media.video):
+                media = self.probe(source)
+            self.applyMedia(media)
+            if self.media.partial:
+                self.fullProbe(source)
         except OSError as e:
             if e.errno == errno.ENOENT:
                 errormsg = '{0}: {1}'.format(os.strerror(errno.ENOENT), source)
@@ -136,6 +157,73 @@ class VideoService(QObject):
             raise ToolNotFoundException('MediaInfo missing')
         return tools
 
+    def applyMedia(self, media: MediaFormat) -> None:
+        if getattr(self.parent, 'verboseLogs', False):
+            self.logger.info(media)
+        streams = MediaStreams(media)
+        if streams.video is None:
+            raise InvalidMediaException('Could not load video stream for {}'.format(self.source))
+        self.media, self.streams = media, streams
+        self.mappings.clear()
+        # noinspection PyUnusedLocal
+        [self.mappings.append(True) for i in range(self.media.nb_streams)]
+
+    @property
+    def probing(self) -> bool:
+        return self.probeproc is not None and self.probeproc.state() != QProcess.NotRunning
+
+    def fullProbe(self, source: str) -> None:
+        args = '-v error -show_streams -show_format -of json "{}"'.format(source)
+        if os.getenv('DEBUG', False) or getattr(self.parent, 'verboseLogs', False):
+            self.logger.info('{0} {1}'.format(self.backends.ffprobe, args))
+        started = time.perf_counter()
+        proc = VideoService.initProc(self.backends.ffprobe)
+        proc.setProcessChannelMode(QProcess.SeparateChannels)
+        proc.setArguments(shlex.split(args))
+        proc.finished.connect(lambda: self.on_fullProbe(proc, source, started))
+        self.probeproc = proc
+        proc.start()
+
+    def on_fullProbe(self, proc: QProcess, source: str, started: float) -> None:
+        if proc is not self.probeproc:
+            return
+        self.probeproc = None
+        if proc.exitStatus() != QProcess.NormalExit or proc.exitCode() != 0:
+            self.logger.error('background probe failed for {0}: {1}'
+                              .format(source, proc.readAllStandardError().data().decode().strip()))
+            return
+        json_data = proc.readAllStandardOutput().data().decode()
+        duration = self.media.duration
+        try:
+            self.applyMedia(MediaFormat.fromJSON(json_data))
+        except (JSONDecodeError, InvalidMediaException):
+            self.logger.exception('Could not apply background probe of {}'.format(source), exc_info=True)
+            return
+        if self.media.duration != duration:
+            self.logger.info('full probe of {0} corrected duration {1:.3f} -> {2:.3f} s'
+                             .format(source, duration, self.media.duration))
+            self.refreshDuration(source)
+        self.probecache.put(source, json_data)
+        self.logger.info('background probe of {0} took {1:.1f} ms ({2} streams)'
+                         .format(source, (time.perf_counter() - started) * 1000, self.media.nb_streams))
+        self.mediaProbed.emit()
+
+    def refreshDuration(self, source: str) -> None:
+        # keyframe indexing starts straight after a fast open, so its end of file sentinel and progress
+        # were taken from the bounded probe
+        index = self.keyframeIndexes.get(source)
+        if index is None:
+            return
+        index.setDuration(self.media.duration)
+        if index.complete and source not in self.keyframeIndexers:
+            self.keyframeCache.put(index)
+
+    def killProbeProc(self) -> None:
+        if self.probeproc is not None:
+            proc, self.probeproc = self.probeproc, None
+            if proc.state() != QProcess.NotRunning:
+                proc.kill()
+
     @staticmethod
     def initProc(program: str=None, finish: pyqtSlot=None, workingdir: str=None) -> QProcess:
         p = QProcess()
@@ -151,7 +239,7 @@ class VideoService(QObject):
 
     def checkDiskSpace(self, path: str) -> None:
         # noinspection PyCallByClass
-        if self.spaceWarningDelivered or not QFileInfo.exists(path):
+        if self.spaceWarningDelivered or not QFileInfo.exists(path) or QThread.currentThread() != self.thread():
             return
         info = QStorageInfo(path)
         available = info.bytesAvailable() / 1000 / 1000
@@ -165,33 +253,137 @@ class VideoService(QObject):
             self.spaceWarningDelivered = True
 
     @staticmethod
-    def captureFrame(settings: QSettings, source: str, frametime: str, thumbsize: QSize=None,
-                     external: bool=False) -> QPixmap:
+    def thumbnailCache(settings: QSettings) -> ThumbnailCache:
+        if VideoService.thumbcache is None:
+            path = QStandardPaths.writableLocation(QStandardPaths.CacheLocation).replace(
+                QCoreApplication.applicationName(), QCoreApplication.applicationName().lower())
+            VideoService.thumbcache = ThumbnailCache(
+                os.path.join(path, 'thumbnails'),
+                maxbytes=settings.value('thumbCacheSize', 256, type=int) * 1024 * 1024,
+                fingerprint=settings.value('probeCacheFingerprint', 'off', type=str) in {'on', 'true'})
+        return VideoService.thumbcache
+
+    @staticmethod
+    def frameTools(settings: QSettings) -> Munch:
+        # resolved on the GUI thread, capture workers only ever see these plain values and never the shared
+        # QSettings, which findBackends writes to
+        try:
+            ffmpeg = VideoService.findBackends(settings).ffmpeg
+        except ToolNotFoundException:
+            logging.getLogger(__name__).exception('Could not resolve FFmpeg for frame capture', exc_info=True)
+            ffmpeg = None
+        return Munch(ffmpeg=ffmpeg, backend=settings.value('thumbBackend', 'ffmpeg', type=str),
+                     cache=VideoService.thumbnailCache(settings))
+
+    @staticmethod
+    def cacheThumbnail(key: str, thumb: QPixmap) -> None:
+        if thumb.isNull():
+            return
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.WriteOnly)
+        thumb.save(buffer, 'JPG', 90)
+        buffer.close()
+        VideoService.thumbcache.put(key, data.data())
+
+    @staticmethod
+    def cachedThumbnail(key: str) -> Optional[QPixmap]:
+        data = VideoService.thumbcache.get(key)
+        if data is None:
+            return None
+        thumb = QPixmap()
+        return thumb if thumb.loadFromData(data, 'JPG') else None
+
+    @staticmethod
+    def grabFrames(tools: Munch, source: str, frametimes: List[str], thumbsize: QSize,
+                   callback: Callable[[int, QImage], None]=None, cancelled: Callable[[], bool]=None,
+                   fast: bool=False) -> Optional[List[QImage]]:
+        if tools.backend == 'mpv':
+            thumbnailer = MpvThumbnailer.get()
+            frames = []
+            while thumbnailer is not None and len(frames) < len(frametimes):
+                if cancelled is not None and cancelled():
+                    return None
+                frame = thumbnailer.grab(source, frametimes[len(frames)], thumbsize)
+                if frame is None:
+                    break
+                frames.append(frame)
+                if callback is not None:
+                    callback(len(frames) - 1, frame)
+            if len(frames) == len(frametimes):
+                return frames
+            # whatever the headless player could not serve goes through ffmpeg
+            offset = len(frames)
+            rest = Filmstrip.capture(tools.ffmpeg, source, frametimes[offset:], thumbsize,
+                                     None if callback is None else lambda i, f: callback(offset + i, f),
+                                     cancelled, fast)
+            return None if rest is None else frames + rest
+        return Filmstrip.capture(tools.ffmpeg, source, frametimes, thumbsize, callback, cancelled, fast)
+
+    @staticmethod
+    def captureFrame(tools: Munch, source: str, frametime: str, thumbsize: QSize=None,
+                     external: bool=False, cancelled: Callable[[], bool]=None) -> QPixmap:
         if thumbsize is None:
             thumbsize = VideoService.config.thumbnails['INDEX']
-        capres = QPixmap()
-        img = QTemporaryFile(os.path.join(QDir.tempPath(), 'XXXXXX.jpg'))
-        if img.open():
-            imagecap = img.fileName()
-            cmd = VideoService.findBackends(settings).ffmpeg
-            tsize = '{0:d}x{1:d}'.format(thumbsize.width(), thumbsize.height())
-            args = '-hide_banner -ss {frametime} -i "{source}" -vframes 1 -s {tsize} -y "{imagecap}"'.format(**locals())
-            proc = VideoService.initProc()
-            if proc.state() == QProcess.NotRunning:
-                proc.start(cmd, shlex.split(args))
-                proc.waitForFinished(-1)
-                if proc.exitStatus() == QProcess.NormalExit and proc.exitCode() == 0:
-                    capres = QPixmap(imagecap, 'JPG')
-                if external:
-                    painter = QPainter(capres)
-                    painter.drawPixmap(0, 0, QPixmap(':/images/external.png', 'PNG'))
-                    painter.end()
-        img.remove()
+        cache = tools.cache
+        mediakey = cache.mediaKey(source)
+        if mediakey is not None:
+            key = cache.key(mediakey, frametime, thumbsize.width(), thumbsize.height(), external)
+            capres = VideoService.cachedThumbnail(key)
+            if capres is not None:
+                return capres
+        # raw rgb24 over a pipe straight into a QImage, no temp file or jpeg encode/decode round trip
+        frames = VideoService.grabFrames(tools, source, [frametime], thumbsize, cancelled=cancelled)
+        capres = QPixmap.fromImage(frames[0]) if frames else QPixmap()
+        if external and not capres.isNull():
+            painter = QPainter(capres)
+            painter.drawPixmap(0, 0, QPixmap(':/images/external.png', 'PNG'))
+            painter.end()
+        if mediakey is not None:
+            VideoService.cacheThumbnail(key, capres)
         return capres
 
+    @staticmethod
+    def captureFrames(tools: Munch, source: str, frametimes: List[str], thumbsize: QSize=None,
+                      callback: Callable[[int, QPixmap], None]=None, cancelled: Callable[[], bool]=None,
+                      fast: bool=False) -> List[QPixmap]:
+        if thumbsize is None:
+            thumbsize = VideoService.config.thumbnails['INDEX']
+        cache = tools.cache
+        mediakey = cache.mediaKey(source)
+        keys, thumbs = [], [None] * len(frametimes)
+        if mediakey is not None:
+            keys = [cache.key(mediakey, frametime, thumbsize.width(), thumbsize.height(), fast=fast)
+                    for frametime in frametimes]
+            thumbs = [VideoService.cachedThumbnail(key) for key in keys]
+        if callback is not None:
+            [callback(i, thumb) for i, thumb in enumerate(thumbs) if thumb is not None]
+        # only the frames missing from the disk cache go through ffmpeg
+        missing = [i for i, thumb in enumerate(thumbs) if thumb is None]
+
+        def captured(pos: int, frame: QImage) -> None:
+            i = missing[pos]
+            thumbs[i] = QPixmap.fromImage(frame)
+            if mediakey is not None:
+                VideoService.cacheThumbnail(keys[i], thumbs[i])
+            if callback is not None:
+                callback(i, thumbs[i])
+
+        if len(missing) and VideoService.grabFrames(tools, source, [frametimes[i] for i in missing], thumbsize,
+                                                    captured, cancelled, fast) is None:
+            for i in missing:
+                if cancelled is not None and cancelled():
+                    break
+                if thumbs[i] is None:
+                    thumbs[i] = VideoService.captureFrame(tools, source, frametimes[i], thumbsize,
+                                                          cancelled=cancelled)
+                    if callback is not None:
+                        callback(i, thumbs[i])
+        return thumbs
+
     # noinspection PyBroadException
-    def testJoin(self, file1: str, file2: str) -> bool:
-        result = False
+    def testJoin(self, file1: str, file2: str, stream_maps: Optional[Tuple[str, str]]=None) -> Tuple[bool, str]:
+        result, error = False, ''
         self.logger.info('attempting to test joining of "{0}" & "{1}"'.format(file1, file2))
         try:
             # 1. check audio + video codecs
@@ -199,25 +391,24 @@ class VideoService(QObject):
             file2_codecs = self.codecs(file2)
             if file1_codecs != file2_codecs:
                 self.logger.info('join test failed for {0} and {1}: codecs mismatched'.format(file1, file2))
-                self.lastError = '<p>The audio + video format of this media file is not the same as the files ' \
-                                 'already in your clip index.</p>' \
-                                 '<div align="center">Current files are <b>{0}</b> (video) and ' \
-                                 '<b>{1}</b> (audio)<br/>' \
-                                 'Failed media is <b>{2}</b> (video) and <b>{3}</b> (audio)</div>'
-                self.lastError = self.lastError.format(file1_codecs[0], file1_codecs[1],
-                                                       file2_codecs[0], file2_codecs[1])
-                return result
+                error = '<p>The audio + video format of this media file is not the same as the files ' \
+                        'already in your clip index.</p>' \
+                        '<div align="center">Current files are <b>{0}</b> (video) and ' \
+                        '<b>{1}</b> (audio)<br/>' \
+                        'Failed media is <b>{2}</b> (video) and <b>{3}</b> (audio)</div>'
+                error = error.format(file1_codecs[0], file1_codecs[1], file2_codecs[0], file2_codecs[1])
+                return result, error
             # 2. check frame sizes
             size1 = self.framesize(file1)
             size2 = self.framesize(file2)
             if size1 != size2:
                 self.logger.info('join test failed for {0} and {1}: frame size mismatched'.format(file1, file2))
-                self.lastError = '<p>The frame size of this media file is not the same as the files already in ' \
-                                 'your clip index.</p>' \
-                                 '<div align="center">Current media clips are <b>{0}x{1}</b>' \
-                                 '<br/>Failed media file is <b>{2}x{3}</b></div>'
-                self.lastError = self.lastError.format(size1.width(), size1.height(), size2.width(), size2.height())
-                return result
+                error = '<p>The frame size of this media file is not the same as the files already in ' \
+                        'your clip index.</p>' \
+                        '<div align="center">Current media clips are <b>{0}x{1}</b>' \
+                        '<br/>Failed media file is <b>{2}x{3}</b></div>'
+                error = error.format(size1.width(), size1.height(), size2.width(), size2.height())
+                return result, error
             # 2. generate temporary file handles
             _, ext = os.path.splitext(file1)
             file1_cut = QTemporaryFile(os.path.join(QDir.tempPath(), 'XXXXXX{}'.format(ext)))
@@ -225,8 +416,10 @@ class VideoService(QObject):
             final_join = QTemporaryFile(os.path.join(QDir.tempPath(), 'XXXXXX{}'.format(ext)))
             # 3. produce 4 secs clips from input files for join test
             if file1_cut.open() and file2_cut.open() and final_join.open():
-                result1 = self.cut(file1, file1_cut.fileName(), '00:00:00.000', '00:00:04.00', False)
-                result2 = self.cut(file2, file2_cut.fileName(), '00:00:00.000', '00:00:04.00', False)
+                result1 = self.cut(file1, file1_cut.fileName(), '00:00:00.000', '00:00:04.00', False,
+                                   stream_maps=stream_maps)
+                result2 = self.cut(file2, file2_cut.fileName(), '00:00:00.000', '00:00:04.00', False,
+                                   stream_maps=stream_maps)
                 if result1 and result2:
                     # 4. attempt join of temp 2 second clips
                     result = self.join([file1_cut.fileName(), file2_cut.fileName()],
@@ -235,38 +428,39 @@ class VideoService(QObject):
         except BaseException:
             self.logger.exception('Exception in VideoService.testJoin', exc_info=True)
             result = False
-        return result
+        return result, error
 
     def framesize(self, source: str = None) -> QSize:
-        if source is None and hasattr(self.streams, 'video'):
-            return QSize(int(self.streams.video.width), int(self.streams.video.height))
-        else:
-            args = '-i "{}"'.format(source)
-            result = self.cmdExec(self.backends.ffmpeg, args, True)
-            matches = re.search(r'Stream.*Video:.*[,\s](?P<width>\d+?)x(?P<height>\d+?)[,\s]',
-                                result, re.DOTALL).groupdict()
-            return QSize(int(matches['width']), int(matches['height']))
+        if source is None and self.streams.video is not None:
+            return QSize(self.streams.video.width, self.streams.video.height)
+        summary = self.mediaSummary(source)
+        return QSize(summary.width, summary.height)
 
     def duration(self, source: str = None) -> QTime:
-        if source is None and hasattr(self.media, 'format') and self.parent is not None:
-            return self.parent.delta2QTime(float(self.media.format.duration))
-        else:
-            args = '-i "{}"'.format(source)
-            result = self.cmdExec(self.backends.ffmpeg, args, True)
-            matches = re.search(r'Duration:\s(?P<hrs>\d+?):(?P<mins>\d+?):(?P<secs>\d+\.\d+?),',
-                                result, re.DOTALL).groupdict()
-            secs, msecs = matches['secs'].split('.')
-            return QTime(int(matches['hrs']), int(matches['mins']), int(secs), int(msecs))
+        if source is None and self.media is not None and self.parent is not None:
+            return self.parent.delta2QTime(self.media.duration)
+        return QTime(0, 0).addMSecs(round(self.mediaSummary(source).duration * 1000))
 
     def codecs(self, source: str = None) -> tuple:
-        if source is None and hasattr(self.streams, 'video'):
+        if source is None and self.streams.video is not None:
             return self.streams.video.codec_name, self.streams.audio[0].codec_name if len(self.streams.audio) else None
-        else:
-            args = '-i "{}"'.format(source)
-            result = self.cmdExec(self.backends.ffmpeg, args, True)
-            vcodec = re.search(r'Stream.*Video:\s(\w+)', result).group(1)
-            acodec = re.search(r'Stream.*Audio:\s(\w+)', result).group(1)
-            return vcodec, acodec
+        summary = self.mediaSummary(source)
+        return summary.vcodec, summary.acodec
+
+    def mediaSummary(self, source: str) -> Munch:
+        key = MediaSignature.key(source)
+        if key is not None and key in self.summaries:
+            return self.summaries[key]
+        media = self.probe(source)
+        video = media.video[0] if len(media.video) else None
+        summary = Munch(vcodec=video.codec_name if video is not None else None,
+                        acodec=media.audio[0].codec_name if len(media.audio) else None,
+                        width=video.width if video is not None else 0,
+                        height=video.height if video is not None else 0,
+                        duration=media.duration)
+        if key is not None:
+            self.summaries[key] = summary
+        return summary
 
     def parseMappings(self, allstreams: bool = True) -> str:
         if not len(self.mappings) or (self.parent is not None and self.parent.hasExternals()):
@@ -291,9 +485,10 @@ class VideoService(QObject):
         return False
 
     def cut(self, source: str, output: str, frametime: str, duration: str, allstreams: bool=True, vcodec: str=None,
-            run: bool=True) -> Union[bool, str]:
+            run: bool=True, stream_maps: Optional[Tuple[str, str]]=None) -> Union[bool, str]:
         self.checkDiskSpace(output)
-        stream_map = self.parseMappings(allstreams)
+        # worker threads pass the (all streams, fallback) maps taken on the GUI thread instead of reading its state
+        stream_map = self.parseMappings(allstreams) if stream_maps is None else stream_maps[0 if allstreams else 1]
         if vcodec is not None:
             encode_options = VideoService.config.encoding.get(vcodec, vcodec)
             args = '-v 32 -i "{}" -ss {} -t {} -c:v {} -c:a copy -c:s copy {}-avoid_negative_ts 1 ' \
@@ -307,7 +502,7 @@ class VideoService(QObject):
                 if allstreams:
                     # cut failed so try again without mapping all media streams
                     self.logger.info('cut resulted in zero length file, trying again without all stream mapping')
-                    self.cut(source, output, frametime, duration, False)
+                    self.cut(source, output, frametime, duration, False, stream_maps=stream_maps)
                 else:
                     # both attempts to cut have failed so exit and let user know
                     VideoService.cleanup([output])
@@ -456,7 +651,8 @@ class VideoService(QObject):
 
     def join(self, inputs: List[str], output: str, allstreams: bool=True, chapters: Optional[List[str]]=None) -> bool:
         self.checkDiskSpace(output)
-        filelist = os.path.normpath(os.path.join(os.path.dirname(inputs[0]), '_vidcutter.list'))
+        filelist = os.path.normpath(os.path.join(os.path.dirname(inputs[0]), '_vidcutter_{}.list'
+                                                 .format(os.path.splitext(os.path.basename(output))[0])))
         with open(filelist, 'w') as f:
             [f.write('file \'{}\'\n'.format(file.replace("'", "\\'"))) for file in inputs]
         stream_map = '-map 0 ' if allstreams else ''
@@ -473,12 +669,42 @@ class VideoService(QObject):
             os.remove(ffmetadata)
         return result
 
-    def getChapterFile(self, scenes: List[str], titles: List[str]=None) -> str:
+    def directExport(self, source: str, clips: List[tuple], output: str, allstreams: bool=True,
+                     chapters: Optional[List[str]]=None) -> bool:
+        self.checkDiskSpace(output)
+        filelist = os.path.normpath(os.path.join(os.path.dirname(output), '_vidcutter_{}.list'
+                                                 .format(os.path.splitext(os.path.basename(output))[0])))
+        # a stream copied segment starts on the keyframe before its inpoint and the demuxer would give that
+        # pre-roll timestamps overlapping the previous segment, so inpoints are moved back onto the keyframe
+        started = time.perf_counter()
+        clips = [(self.keyframeBefore(source, inpoint, outpoint), outpoint) for inpoint, outpoint in clips]
+        # without a cached index this is a keyframe scan on the GUI thread, so report it apart from the ffmpeg pass
+        self.logger.info('direct export: {0} inpoints snapped to keyframes in {1:.0f} ms'
+                         .format(len(clips), (time.perf_counter() - started) * 1000))
+        with open(filelist, 'w') as f:
+            for inpoint, outpoint in clips:
+                f.write('file \'{0}\'\ninpoint {1:.3f}\noutpoint {2:.3f}\n'
+                        .format(source.replace("'", "\\'"), inpoint, outpoint))
+        stream_map = self.parseMappings(allstreams)
+        ffmetadata = None
+        if chapters is not None and len(chapters):
+            ffmetadata = self.getChapterFile([output] * len(clips), chapters,
+                                             [round((outpoint - inpoint) * 1000) for inpoint, outpoint in clips])
+            metadata = '-i "{}" -map_metadata 1 '.format(ffmetadata)
+        else:
+            metadata = ''
+        args = '-v error -f concat -safe 0 -i "{0}" {1}-c copy {2}-avoid_negative_ts 1 -y "{3}"'
+        result = self.cmdExec(self.backends.ffmpeg, args.format(filelist, metadata, stream_map, output))
+        os.remove(filelist)
+        if ffmetadata is not None:
+            os.remove(ffmetadata)
+        return result
+
+    def getChapterFile(self, scenes: List[str], titles: List[str]=None, durations: List[int]=None) -> str:
         ffmetadata = FFMetadata()
         pos = 0
         for index, scene in enumerate(scenes):
-            duration = self.duration(scene)
-            end = pos + duration.msecsSinceStartOfDay()
+            end = pos + (durations[index] if durations is not None else self.duration(scene).msecsSinceStartOfDay())
             ffmetadata.add_chapter(pos, end, titles[index])
             pos = end
         ffmetafile = os.path.normpath(os.path.join(os.path.dirname(scenes[0]), 'ffmetadata.txt'))
@@ -549,11 +775,29 @@ class VideoService(QObject):
         if hasattr(self, 'filterproc') and self.filterproc.state() != QProcess.NotRunning:
             self.filterproc.kill()
 
-    def probe(self, source: str) -> Munch:
+    def probe(self, source: str, fast: bool=False) -> MediaFormat:
         try:
-            args = '-v error -show_streams -show_format -of json "{}"'.format(source)
-            json_data = self.cmdExec(self.backends.ffprobe, args, output=True, mergechannels=False)
-            return Munch.fromDict(loads(json_data))
+            started = time.perf_counter()
+            json_data = self.probecache.get(source)
+            cached = json_data is not None
+            partial = fast and not cached
+            if partial:
+                # bounded probe of the first video stream, just enough to get playback going
+                args = '-v error -probesize {0} -analyzeduration {1} -select_streams v:0 -show_streams -show_format ' \
+                       '-of json "{2}"'.format(self.fastProbeSize, self.fastProbeDuration, source)
+                json_data = self.cmdExec(self.backends.ffprobe, args, output=True, mergechannels=False)
+            elif not cached:
+                args = '-v error -show_streams -show_format -of json "{}"'.format(source)
+                json_data = self.cmdExec(self.backends.ffprobe, args, output=True, mergechannels=False)
+            media = MediaFormat.fromJSON(json_data, partial)
+            if not cached and not partial:
+                self.probecache.put(source, json_data)
+            self.logger.info('{0}probe of {1} took {2:.1f} ms (cache {3}, hits={4}, misses={5}, evictions={6})'
+                             .format('fast ' if partial else '', source, (time.perf_counter() - started) * 1000,
+                                     'hit' if cached else 'miss',
+                                     self.probecache.stats.hits, self.probecache.stats.misses,
+                                     self.probecache.stats.evictions))
+            return media
         except FileNotFoundError:
             self.logger.exception('FFprobe could not find media file: {}'.format(source), exc_info=True)
             raise
@@ -561,31 +805,100 @@ class VideoService(QObject):
             self.logger.exception('FFprobe JSON decoding error', exc_info=True)
             raise
 
+    def sourceDuration(self, source: str) -> float:
+        if QDir.toNativeSeparators(source) == self.source and self.media is not None:
+            return self.media.duration
+        return self.mediaSummary(source).duration
+
+    def indexKeyframes(self, source: str, priority: QThread.Priority = QThread.InheritPriority) -> KeyframeIndex:
+        index = self.keyframeIndexes.get(source)
+        if index is not None and (index.complete or source in self.keyframeIndexers):
+            return index
+        index = self.keyframeCache.get(source)
+        if index is not None:
+            self.keyframeIndexes[source] = index
+            return index
+        index = KeyframeIndex(source, self.sourceDuration(source))
+        indexer = KeyframeIndexer(self.backends.ffprobe, index, self)
+        indexer.progress.connect(self.keyframesProgress)
+        indexer.finished.connect(partial(self.on_keyframesIndexed, indexer))
+        self.keyframeIndexes[source] = index
+        self.keyframeIndexers[source] = indexer
+        indexer.start(priority)
+        return index
+
+    def on_keyframesIndexed(self, indexer: KeyframeIndexer) -> None:
+        source = indexer.index.source
+        if self.keyframeIndexers.get(source) is indexer:
+            del self.keyframeIndexers[source]
+        if indexer.index.complete and not indexer.failed:
+            self.keyframeCache.put(indexer.index)
+        elif self.keyframeIndexes.get(source) is indexer.index:
+            del self.keyframeIndexes[source]
+        indexer.deleteLater()
+
+    def cancelKeyframes(self) -> None:
+        # completed indexes are kept for other sources in the project, only running scans are dropped
+        for source, indexer in list(self.keyframeIndexers.items()):
+            indexer.requestInterruption()
+            indexer.wait()
+            self.keyframeIndexes.pop(source, None)
+        self.keyframeIndexers.clear()
+
+    def awaitKeyframes(self, index: KeyframeIndex, start: float = None, end: float = None) -> None:
+        indexer = self.keyframeIndexers.get(index.source)
+        if indexer is not None and indexer.isRunning() and indexer.priority() < QThread.NormalPriority:
+            # someone is now waiting on a background scan so stop yielding to the GUI
+            indexer.setPriority(QThread.NormalPriority)
+        while indexer is not None and indexer.isRunning():
+            if index.covers(start, end) if start is not None else index.complete:
+                break
+            indexer.wait(100)
+            QCoreApplication.processEvents(QEventLoop.ExcludeUserInputEvents)
+
+    def prepareKeyframes(self, source: str, timestamps: List[float]) -> None:
+        if self.keyframeLookup != 'local':
+            return
+        index = self.keyframeIndexes.get(source)
+        if index is not None and index.complete:
+            return
+        resolved = self.boundaryTimes.setdefault(source, set())
+        timestamps = [timestamp for timestamp in timestamps if timestamp not in resolved]
+        if not len(timestamps):
+            return
+        locator = KeyframeLocator(self.backends.ffprobe, source, self.sourceDuration(source), timestamps,
+                                  workers=QThread.idealThreadCount())
+        locator.start()
+        while not locator.wait(100):
+            QCoreApplication.processEvents(QEventLoop.ExcludeUserInputEvents)
+        found = set(locator.times)
+        found.update(self.boundaryKeyframes.get(source, []))
+        self.boundaryKeyframes[source] = array('d', sorted(found))
+        resolved.update(timestamps)
+
     def getKeyframes(self, source: str, formatted_time: bool = False) -> list:
-        if len(self.keyframes) and source == self.source:
-            return self.keyframes
-        timecode = '0:00:00.000000' if formatted_time else 0
-        args = '-v error -show_packets -select_streams v -show_entries packet=pts_time,flags ' \
-               '{0}-of csv "{1}"'.format('-sexagesimal ' if formatted_time else '', source)
-        result = self.cmdExec(self.backends.ffprobe, args, output=True, suppresslog=True, mergechannels=False)
-        keyframe_times = []
-        for line in result.split('\n'):
-            if line.split(',')[1] != 'N/A':
-                timecode = line.split(',')[1]
-            if re.search(',K', line):
-                if formatted_time:
-                    keyframe_times.append(timecode[:-3])
-                else:
-                    keyframe_times.append(float(timecode))
-        last_keyframe = self.duration().toString('h:mm:ss.zzz')
-        if keyframe_times[-1] != last_keyframe:
-            keyframe_times.append(last_keyframe)
-        if source == self.source and not formatted_time:
-            self.keyframes = keyframe_times
-        return keyframe_times
+        index = self.indexKeyframes(source)
+        self.awaitKeyframes(index)
+        return index.formatted() if formatted_time else index.times.tolist()
+
+    def clipKeyframes(self, source: str, start: float, end: float) -> array:
+        index = self.keyframeIndexes.get(source)
+        if self.keyframeLookup == 'local' and (index is None or not index.complete):
+            # probe small windows around the clip boundaries rather than the whole file
+            self.prepareKeyframes(source, [start, end])
+            return self.boundaryKeyframes[source]
+        # only wait for the index to reach past this clip, not for the whole file to be scanned
+        index = self.indexKeyframes(source)
+        self.awaitKeyframes(index, start, end)
+        return index.times
+
+    def keyframeBefore(self, source: str, start: float, end: float) -> float:
+        keyframes = self.clipKeyframes(source, start, end)
+        pos = bisect_right(keyframes, start + 0.0005)
+        return keyframes[pos - 1] if pos > 0 else 0.0
 
     def getGOPbisections(self, source: str, start: float, end: float) -> dict:
-        keyframes = self.getKeyframes(source)
+        keyframes = self.clipKeyframes(source, start, end)
         start_pos = bisect_left(keyframes, start)
         end_pos = bisect_left(keyframes, end)
         return {
@@ -602,7 +915,7 @@ class VideoService(QObject):
         }
 
     def isMPEGcodec(self, source: str = None) -> bool:
-        if source is None and hasattr(self.streams, 'video'):
+        if source is None and self.streams.video is not None:
             codec = self.streams.video.codec_name
         else:
             codec = self.codecs(source)[0].lower()
@@ -660,26 +973,28 @@ class VideoService(QObject):
 
     def cmdExec(self, cmd: str, args: str=None, output: bool=False, suppresslog: bool=False, workdir: str=None,
                 mergechannels: bool=True):
-        if self.proc.state() == QProcess.NotRunning:
+        # worker threads get their own process, the shared one belongs to the GUI thread
+        proc = self.proc if QThread.currentThread() == self.thread() else VideoService.initProc()
+        if proc.state() == QProcess.NotRunning:
             if cmd == self.backends.mediainfo or not mergechannels:
-                self.proc.setProcessChannelMode(QProcess.SeparateChannels)
+                proc.setProcessChannelMode(QProcess.SeparateChannels)
             if cmd in {self.backends.ffmpeg, self.backends.ffprobe}:
                 args = '-hide_banner {}'.format(args)
             if os.getenv('DEBUG', False) or getattr(self.parent, 'verboseLogs', False):
                 self.logger.info('{0} {1}'.format(cmd, args if args is not None else ''))
-            self.proc.setWorkingDirectory(workdir if workdir is not None else VideoService.getAppPath())
-            self.proc.start(cmd, shlex.split(args))
-            self.proc.readyReadStandardOutput.connect(
-                partial(self.cmdOut, self.proc.readAllStandardOutput().data().decode().strip()))
-            self.proc.waitForFinished(-1)
+            proc.setWorkingDirectory(workdir if workdir is not None else VideoService.getAppPath())
+            proc.start(cmd, shlex.split(args))
+            proc.readyReadStandardOutput.connect(
+                partial(self.cmdOut, proc.readAllStandardOutput().data().decode().strip()))
+            proc.waitForFinished(-1)
             if cmd == self.backends.mediainfo or not mergechannels:
-                self.proc.setProcessChannelMode(QProcess.MergedChannels)
+                proc.setProcessChannelMode(QProcess.MergedChannels)
             if output:
-                cmdoutput = self.proc.readAllStandardOutput().data().decode().strip()
+                cmdoutput = proc.readAllStandardOutput().data().decode().strip()
                 if getattr(self.parent, 'verboseLogs', False) and not suppresslog:
                     self.logger.info('cmd output: {}'.format(cmdoutput))
                 return cmdoutput
-            return self.proc.exitStatus() == QProcess.NormalExit and self.proc.exitCode() == 0
+            return proc.exitStatus() == QProcess.NormalExit and proc.exitCode() == 0
         return False
 
     @pyqtSlot(str)
@@ -48,7 +48,7 @@ class StreamSelector(QDialog):
         buttons.accepted.connect(self.close)
         layout = QVBoxLayout()
         layout.setSpacing(15)
-        if len(self.streams.video):
+        if self.streams.video is not None:
             layout.addWidget(self.video())
         if len(self.streams.audio):
             layout.addWidget(self.audio())
@@ -68,9 +68,8 @@ class StreamSelector(QDialog):
         return line
 
     def video(self) -> QGroupBox:
-        framerate = round(eval(self.streams.video.avg_frame_rate), 3)
-        ratio = self.streams.video.display_aspect_ratio.split(':')
-        ratio = round(int(ratio[0]) / int(ratio[1]), 3)
+        framerate = round(self.streams.video.frame_rate, 3)
+        ratio = round(self.streams.video.aspect_ratio, 3)
         icon = QLabel('<img src=":images/{}/streams-video.png" />'.format(self.parent.theme), self)
         label = QLabel('''
             <b>index:</b> {index}
@@ -105,13 +104,13 @@ class StreamSelector(QDialog):
         audiolayout = QGridLayout()
         audiolayout.setSpacing(15)
         for stream in self.streams.audio:
-            sameplerate = round(int(stream.sample_rate) / 1000, 1)
+            sameplerate = round(stream.sample_rate / 1000, 1)
             checkbox = StreamSelectorCheckBox(stream.index, 'Toggle audio stream', self)
             icon = StreamSelectorLabel('<img src=":images/{}/streams-audio.png" />'.format(self.parent.theme),
                                        checkbox, True, self)
             labeltext = '<b>index:</b> {}<br/>'.format(stream.index)
-            if hasattr(stream, 'tags') and hasattr(stream.tags, 'language'):
-                labeltext += '<b>language:</b> {}<br/>'.format(ISO639_2[stream.tags.language])
+            if stream.tags.get('language') in ISO639_2:
+                labeltext += '<b>language:</b> {}<br/>'.format(ISO639_2[stream.tags['language']])
             labeltext += '<b>codec:</b> {}<br/>'.format(stream.codec_long_name)
             labeltext += '<b>channels:</b> {0} &nbsp; <b>sample rate:</b> {1:.2f} kHz' \
                          .format(stream.channels, sameplerate)
@@ -148,8 +147,8 @@ class StreamSelector(QDialog):
             icon = StreamSelectorLabel('<img src=":images/{}/streams-subtitle.png" />'.format(self.parent.theme),
                                        checkbox, True, self)
             labeltext = '<b>index:</b> {}<br/>'.format(stream.index)
-            if hasattr(stream, 'tags') and hasattr(stream.tags, 'language'):
-                labeltext += '<b>language:</b> {}<br/>'.format(ISO639_2[stream.tags.language])
+            if stream.tags.get('language') in ISO639_2:
+                labeltext += '<b>language:</b> {}<br/>'.format(ISO639_2[stream.tags['language']])
             labeltext += '<b>codec:</b> {}'.format(stream.codec_long_name)
             label = StreamSelectorLabel(labeltext, checkbox, False, self)
             rows = subtitlelayout.rowCount()
@@ -430,12 +430,42 @@ class ToolsPage(QWidget):
         pathsLayout.addLayout(resetlayout)
         pathsGroup = QGroupBox('Paths')
         pathsGroup.setLayout(pathsLayout)
+        self.cachelabel = QLabel(self)
+        self.cachelabel.setWordWrap(True)
+        clearcachebutton = QPushButton('Clear cache', self)
+        clearcachebutton.setObjectName('clearcachebutton')
+        clearcachebutton.setToolTip('Remove all cached thumbnail images')
+        clearcachebutton.setCursor(Qt.PointingHandCursor)
+        clearcachebutton.clicked.connect(self.clearCache)
+        cacheLayout = QHBoxLayout()
+        cacheLayout.setContentsMargins(11, 11, 11, 20)
+        cacheLayout.addWidget(self.cachelabel, 1)
+        cacheLayout.addWidget(clearcachebutton)
+        cacheGroup = QGroupBox('Thumbnail cache')
+        cacheGroup.setLayout(cacheLayout)
+        self.updateCacheStats()
         mainLayout = QVBoxLayout()
         mainLayout.setSpacing(15)
         mainLayout.addWidget(pathsGroup)
+        mainLayout.addWidget(cacheGroup)
         mainLayout.addStretch(1)
         self.setLayout(mainLayout)
 
+    def updateCacheStats(self) -> None:
+        cache = VideoService.thumbnailCache(self.parent.settings)
+        if not cache.enabled:
+            self.cachelabel.setText('Disabled')
+            return
+        self.cachelabel.setText('{0} images using {1:.1f} of {2:.0f} MB<br/>'
+                                '<small>hits: {3} &nbsp; misses: {4} &nbsp; evictions: {5}</small>'
+                                .format(cache.count(), cache.size() / 1048576, cache.maxbytes / 1048576,
+                                        cache.stats.hits, cache.stats.misses, cache.stats.evictions))
+
+    @pyqtSlot()
+    def clearCache(self) -> None:
+        VideoService.thumbnailCache(self.parent.settings).clear()
+        self.updateCacheStats()
+
     @pyqtSlot()
     def resetPaths(self) -> None:
         self.parent.settings.beginGroup('tools')
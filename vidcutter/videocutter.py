@@ -27,13 +27,15 @@ import os
 import re
 import sys
 import time
+from bisect import bisect_left, insort
 from datetime import timedelta
 from functools import partial
 from typing import Callable, List, Optional, Union
 
-from PyQt5.QtCore import (pyqtSignal, pyqtSlot, QBuffer, QByteArray, QDir, QFile, QFileInfo, QModelIndex, QPoint, QSize,
-                          Qt, QTextStream, QTime, QTimer, QUrl)
-from PyQt5.QtGui import QDesktopServices, QFont, QFontDatabase, QIcon, QKeyEvent, QPixmap, QShowEvent
+from PyQt5.QtCore import (pyqtSignal, pyqtSlot, QBuffer, QByteArray, QDir, QElapsedTimer, QFile, QFileInfo, QModelIndex,
+                          QPoint, QSize, Qt, QTextStream, QThread, QTime, QTimer, QUrl)
+from PyQt5.QtGui import (QColor, QDesktopServices, QFont, QFontDatabase, QIcon, QKeyEvent, QPixmap, QPixmapCache,
+                         QShowEvent)
 from PyQt5.QtWidgets import (QAction, qApp, QApplication, QDialog, QFileDialog, QFrame, QGroupBox, QHBoxLayout, QLabel,
                              QListWidgetItem, QMainWindow, QMenu, QMessageBox, QPushButton, QSizePolicy, QStyleFactory,
                              QVBoxLayout, QWidget)
@@ -54,10 +56,13 @@ from vidcutter.videosliderwidget import VideoSliderWidget
 from vidcutter.videostyle import VideoStyleDark, VideoStyleLight
 
 from vidcutter.libs.config import Config, InvalidMediaException, VideoFilter
+from vidcutter.libs.cutqueue import ClipCutter
+from vidcutter.libs.ingestion import ClipIngestor
 from vidcutter.libs.mpvwidget import mpvWidget
 from vidcutter.libs.munch import Munch
 from vidcutter.libs.notifications import JobCompleteNotification
 from vidcutter.libs.taskbarprogress import TaskbarProgress
+from vidcutter.libs.thumbnails import ThumbnailScheduler
 from vidcutter.libs.videoservice import VideoService
 from vidcutter.libs.widgets import (ClipErrorsDialog, VCBlinkText, VCDoubleInputDialog, VCFilterMenuAction,
                                     VCFrameCounter, VCInputDialog, VCMessageBox, VCProgressDialog, VCTimeCounter,
@@ -108,21 +113,57 @@ class VideoCutter(QWidget):
         self.enablePBO = self.settings.value('enablePBO', 'off', type=str) in {'on', 'true'}
         self.keepRatio = self.settings.value('aspectRatio', 'keep', type=str) == 'keep'
         self.keepClips = self.settings.value('keepClips', 'off', type=str) in {'on', 'true'}
+        # not offered in settings: stream copied outpoint tails still overlap the next segment's timestamps
+        self.directExport = self.settings.value('directExport', 'off', type=str) in {'on', 'true'}
         self.nativeDialogs = self.settings.value('nativeDialogs', 'on', type=str) in {'on', 'true'}
         self.indexLayout = self.settings.value('indexLayout', 'right', type=str)
         self.timelineThumbs = self.settings.value('timelineThumbs', 'on', type=str) in {'on', 'true'}
         self.showConsole = self.settings.value('showConsole', 'off', type=str) in {'on', 'true'}
         self.smartcut = self.settings.value('smartcut', 'off', type=str) in {'on', 'true'}
+        self.fastOpen = self.settings.value('fastOpen', 'on', type=str) in {'on', 'true'}
+        self.keyframesOnLoad = self.settings.value('keyframesOnLoad', 'off', type=str) in {'on', 'true'}
         self.level1Seek = self.settings.value('level1Seek', 2, type=float)
         self.level2Seek = self.settings.value('level2Seek', 5, type=float)
         self.verboseLogs = self.parent.verboseLogs
         self.lastFolder = self.settings.value('lastFolder', QDir.homePath(), type=str)
+        QPixmapCache.setCacheLimit(self.settings.value('imageCacheSize', 20480, type=int))
 
         self.videoService = VideoService(self.settings, self)
         self.videoService.progress.connect(self.seekSlider.updateProgress)
         self.videoService.finished.connect(self.smartmonitor)
         self.videoService.error.connect(self.completeOnError)
         self.videoService.addScenes.connect(self.addScenes)
+        self.videoService.mediaProbed.connect(self.on_mediaProbed)
+        self.videoService.keyframesProgress.connect(self.on_keyframesProgress)
+        self.openTimer = QElapsedTimer()
+
+        self.clipIngestor = ClipIngestor(self.videoService,
+                                         self.settings.value('ingestWorkers', min(QThread.idealThreadCount(), 4),
+                                                             type=int), self)
+        self.clipIngestor.clipReady.connect(self.on_clipIngested)
+        self.clipIngestor.clipFailed.connect(self.on_clipIngestFailed)
+        self.clipIngestor.finished.connect(self.on_ingestFinished)
+
+        self.clipCutter = ClipCutter(self.videoService,
+                                     self.settings.value('cutWorkers', min(QThread.idealThreadCount(), 4), type=int),
+                                     self)
+        self.clipCutter.clipCut.connect(self.on_clipCut)
+        self.clipCutter.finished.connect(self.on_cutsFinished)
+        self.cutFilelist = []
+        self.exportTimer = QElapsedTimer()
+        self.exportMode, self.exportBytes = None, 0
+
+        self.thumbnailer = ThumbnailScheduler(self.settings,
+                                              self.settings.value('thumbWorkers', min(QThread.idealThreadCount(), 8),
+                                                                  type=int), self)
+        self.thumbnailer.frameReady.connect(self.seekSlider.on_thumbReady)
+        self.thumbnailer.jobFinished.connect(self.seekSlider.on_thumbsFinished)
+        self.thumbnailer.frameReady.connect(self.on_clipImageReady)
+        self.thumbnailer.jobFinished.connect(self.on_clipImagesFinished)
+        self.imageJobs, self.projectJob = {}, None
+        self.projectTimer = QElapsedTimer()
+        self.placeholderImage = QPixmap(VideoService.config.thumbnails['INDEX'])
+        self.placeholderImage.fill(QColor('#1a1a1a'))
 
         self.project_files = {
             'edl': re.compile(r'(\d+(?:\.?\d+)?)\t(\d+(?:\.?\d+)?)\t([01])'),
@@ -838,6 +879,7 @@ class VideoCutter(QWidget):
                                      'Cannot read project file {0}:\n\n{1}'.format(project_file, file.errorString()))
                 return
             qApp.setOverrideCursor(Qt.WaitCursor)
+            self.projectTimer.start()
             self.clipTimes.clear()
             linenum = 1
             while not file.atEnd():
@@ -863,20 +905,26 @@ class VideoCutter(QWidget):
                             start, stop, _, chapter = mo.groups()
                             clip_start = self.delta2QTime(float(start))
                             clip_end = self.delta2QTime(float(stop))
-                            clip_image = self.captureImage(self.currentMedia, clip_start)
                             if project_type == 'vcp' and self.createChapters and len(chapter):
                                 chapter = chapter[1:len(chapter) - 1]
                                 if not len(chapter):
                                     chapter = None
                             else:
                                 chapter = None
-                            self.clipTimes.append([clip_start, clip_end, clip_image, '', chapter])
+                            self.clipTimes.append([clip_start, clip_end, None, '', chapter])
                         else:
                             qApp.restoreOverrideCursor()
                             QMessageBox.critical(self.parent, 'Invalid project file',
                                                  'Invalid entry at line {0}:\n\n{1}'.format(linenum, line))
                             return
                 linenum += 1
+            # all clip images go out as one job once the list is built, split into small filmstrips across the pool
+            self.projectJob = self.requestImages(self.clipTimes, ThumbnailScheduler.INDEX_PRIORITY, True)
+            self.logger.info('project {0}: {1} clips listed in {2} ms'
+                             .format(project_file, len(self.clipTimes), self.projectTimer.elapsed()))
+            if self.projectJob is None:
+                self.logger.info('project {0}: all clip images cached, opened in {1} ms'
+                                 .format(project_file, self.projectTimer.elapsed()))
             self.toolbar_start.setEnabled(True)
             self.toolbar_end.setDisabled(True)
             self.seekSlider.setRestrictValue(0, False)
@@ -977,6 +1025,8 @@ class VideoCutter(QWidget):
         self.totalRuntime = 0
         self.setRunningTime(self.delta2QTime(self.totalRuntime).toString(self.runtimeformat))
         self.seekSlider.clearRegions()
+        self.seekSlider.cancelThumbs()
+        self.cancelImages()
         self.taskbar.init()
         self.parent.setWindowTitle('{0} - {1}'.format(qApp.applicationName(), os.path.basename(self.currentMedia)))
         if not self.mediaAvailable:
@@ -986,9 +1036,12 @@ class VideoCutter(QWidget):
             self.videoplayerWidget.show()
             self.mediaAvailable = True
         try:
-            self.videoService.setMedia(self.currentMedia)
+            self.openTimer.start()
+            self.videoService.setMedia(self.currentMedia, self.fastOpen)
+            self.enableStreams(not self.videoService.probing)
             self.seekSlider.setFocus()
             self.mpvWidget.play(self.currentMedia)
+            self.precomputeKeyframes()
         except InvalidMediaException:
             qApp.restoreOverrideCursor()
             self.initMediaControls(False)
@@ -1000,6 +1053,26 @@ class VideoCutter(QWidget):
                                  'and make sure to include your operating system, video card, the invalid media file '
                                  'and the version of VidCutter you are currently using.</p>')
 
+    @pyqtSlot()
+    def on_mediaProbed(self) -> None:
+        self.enableStreams(self.mediaAvailable)
+
+    def precomputeKeyframes(self) -> None:
+        # index while the user is still editing so SmartCut exports and the keyframes view start straight away
+        if self.mediaAvailable and self.currentMedia is not None and (self.smartcut or self.keyframesOnLoad):
+            self.videoService.indexKeyframes(self.currentMedia, QThread.LowestPriority)
+
+    @pyqtSlot(float)
+    def on_keyframesProgress(self, progress: float) -> None:
+        if progress < 1.0:
+            self.parent.statusBar().showMessage('Indexing keyframes... {0:.0%}'.format(progress))
+        else:
+            self.parent.statusBar().showMessage('Keyframes indexed', 3000)
+
+    def enableStreams(self, flag: bool=True) -> None:
+        self.streamsAction.setEnabled(flag)
+        self.streamsButton.setEnabled(flag)
+
     def setPlayButton(self, playing: bool=False) -> None:
         self.toolbar_play.setup('{} Media'.format('Pause' if playing else 'Play'),
                                 'Pause currently playing media' if playing else 'Play currently loaded media',
@@ -1025,8 +1098,8 @@ class VideoCutter(QWidget):
         self.toolbar_start.setEnabled(flag)
         self.toolbar_end.setEnabled(False)
         self.toolbar_save.setEnabled(False)
-        self.streamsAction.setEnabled(flag)
-        self.streamsButton.setEnabled(flag)
+        # the selector needs the full probe, on_mediaProbed enables it once the background probe lands
+        self.enableStreams(flag and not self.videoService.probing)
         self.mediainfoAction.setEnabled(flag)
         self.mediainfoButton.setEnabled(flag)
         self.fullscreenButton.setEnabled(flag)
@@ -1051,6 +1124,10 @@ class VideoCutter(QWidget):
     @pyqtSlot(float, int)
     def on_positionChanged(self, progress: float, frame: int) -> None:
         progress *= 1000
+        if self.openTimer.isValid():
+            self.logger.info('time to first frame: {0} ms ({1} open)'
+                             .format(self.openTimer.elapsed(), 'fast' if self.fastOpen else 'full'))
+            self.openTimer.invalidate()
         if self.seekSlider.restrictValue < progress or progress == 0:
             self.seekSlider.setValue(int(progress))
             self.timeCounter.setTime(self.delta2QTime(round(progress)).toString(self.timeformat))
@@ -1151,17 +1228,57 @@ class VideoCutter(QWidget):
         self.saveSetting('smartcut', self.smartcut)
         self.smartcutButton.setChecked(self.smartcut)
         self.showText('SmartCut {}'.format('enabled' if checked else 'disabled'))
+        self.precomputeKeyframes()
 
     @pyqtSlot(list)
     def addScenes(self, scenes: List[list]) -> None:
         if len(scenes):
-            [
-                self.clipTimes.append([scene[0], scene[1], self.captureImage(self.currentMedia, scene[0]), '', None])
-                for scene in scenes if len(scene)
-            ]
+            # list the scenes straight away and let the thumbnail pool fill in their images
+            clips = [[scene[0], scene[1], None, '', None] for scene in scenes if len(scene)]
+            self.clipTimes.extend(clips)
+            self.requestImages(clips, ThumbnailScheduler.SCENES_PRIORITY, True)
             self.renderClipIndex()
         self.filterProgressBar.done(VCProgressDialog.Accepted)
 
+    def requestImages(self, clips: list, priority: int, batched: bool = False) -> Optional[int]:
+        pending = []
+        for clip in clips:
+            clip[2] = self.cachedImage(self.currentMedia, clip[0])
+            if clip[2] is None:
+                clip[2] = self.placeholderImage
+                pending.append(clip)
+        if not len(pending):
+            return None
+        job = self.thumbnailer.submit(self.currentMedia, [clip[0].toString(self.timeformat) for clip in pending],
+                                      priority=priority, batched=batched)
+        self.imageJobs[job] = (self.currentMedia, pending)
+        return job
+
+    def cancelImages(self) -> None:
+        [self.thumbnailer.cancel(job) for job in self.imageJobs]
+        self.imageJobs.clear()
+
+    @pyqtSlot(int, int, QPixmap)
+    def on_clipImageReady(self, job: int, slot: int, thumb: QPixmap) -> None:
+        if job not in self.imageJobs:
+            return
+        source, clips = self.imageJobs[job]
+        clip = clips[slot]
+        clip[2] = thumb
+        self.cacheImage(source, clip[0], thumb)
+        # swap the image on the existing list item and let the delegate repaint it
+        row = next((row for row, item in enumerate(self.clipTimes) if item is clip), None)
+        if row is not None and row < self.cliplist.count():
+            self.cliplist.item(row).setData(Qt.DecorationRole + 1, thumb)
+
+    @pyqtSlot(int)
+    def on_clipImagesFinished(self, job: int) -> None:
+        if job in self.imageJobs and job == self.projectJob:
+            self.logger.info('project opened with {0} clip images in {1} ms'
+                             .format(len(self.imageJobs[job][1]), self.projectTimer.elapsed()))
+            self.projectJob = None
+        self.imageJobs.pop(job, None)
+
     @pyqtSlot(VideoFilter)
     def configFilters(self, name: VideoFilter) -> None:
         if name == VideoFilter.BLACKDETECT:
@@ -1209,48 +1326,59 @@ class VideoCutter(QWidget):
             options=self.getFileDialogOptions())
         if clips is not None and len(clips):
             self.lastFolder = QFileInfo(clips[0]).absolutePath()
-            filesadded = False
-            cliperrors = list()
-            for file in clips:
-                if len(self.clipTimes) > 0:
-                    lastItem = self.clipTimes[len(self.clipTimes) - 1]
-                    file4Test = lastItem[3] if len(lastItem[3]) else self.currentMedia
-                    if self.videoService.testJoin(file4Test, file):
-                        self.clipTimes.append([QTime(0, 0), self.videoService.duration(file),
-                                               self.captureImage(file, QTime(0, 0, second=2), True), file])
-                        filesadded = True
-                    else:
-                        cliperrors.append((file,
-                                           (self.videoService.lastError if len(self.videoService.lastError) else '')))
-                        self.videoService.lastError = ''
-                else:
-                    self.clipTimes.append([QTime(0, 0), self.videoService.duration(file),
-                                           self.captureImage(file, QTime(0, 0, second=2), True), file])
-                    filesadded = True
-            if len(cliperrors):
-                detailedmsg = '''<p>The file(s) listed were found to be incompatible for inclusion to the clip index as
-                            they failed to join in simple tests used to ensure their compatibility. This is
-                            commonly due to differences in frame size, audio/video formats (codecs), or both.</p>
-                            <p>You can join these files as they currently are using traditional video editors like
-                            OpenShot, Kdenlive, ShotCut, Final Cut Pro or Adobe Premiere. They can re-encode media
-                            files with mixed properties so that they are then matching and able to be joined but
-                            be aware that this can be a time consuming process and almost always results in
-                            degraded video quality.</p>
-                            <p>Re-encoding video is not going to ever be supported by VidCutter because those tools
-                            are already available for you both free and commercially.</p>'''
-                errordialog = ClipErrorsDialog(cliperrors, self)
-                errordialog.setDetailedMessage(detailedmsg)
-                errordialog.show()
-            if filesadded:
-                self.showText('media added to index')
-                self.renderClipIndex()
+            reference = None
+            if len(self.clipTimes) > 0:
+                lastItem = self.clipTimes[len(self.clipTimes) - 1]
+                reference = lastItem[3] if len(lastItem[3]) else self.currentMedia
+            self.ingest = Munch(base=len(self.clipTimes), added=[], errors=[])
+            self.clipindex_add.setDisabled(True)
+            self.showText('adding {} media file{}'.format(len(clips), 's' if len(clips) > 1 else ''))
+            self.clipIngestor.start(clips, reference)
+
+    @pyqtSlot(int, str, QTime, QPixmap)
+    def on_clipIngested(self, index: int, file: str, duration: QTime, thumb: QPixmap) -> None:
+        # keep selection order while clips stream in out of order from the worker pool
+        position = min(self.ingest.base + bisect_left(self.ingest.added, index), len(self.clipTimes))
+        insort(self.ingest.added, index)
+        if not thumb.isNull():
+            self.cacheImage(file, QTime(0, 0, 2), thumb, True)
+        self.clipTimes.insert(position, [QTime(0, 0), duration, thumb, file, None])
+        self.renderClipIndex()
+
+    @pyqtSlot(int, str, str)
+    def on_clipIngestFailed(self, index: int, file: str, error: str) -> None:
+        self.ingest.errors.append((index, file, error))
+
+    @pyqtSlot()
+    def on_ingestFinished(self) -> None:
+        self.clipindex_add.setEnabled(not self.inCut)
+        if len(self.ingest.errors):
+            cliperrors = [(file, error) for _, file, error in sorted(self.ingest.errors)]
+            detailedmsg = '''<p>The file(s) listed were found to be incompatible for inclusion to the clip index as
+                        they failed to join in simple tests used to ensure their compatibility. This is
+                        commonly due to differences in frame size, audio/video formats (codecs), or both.</p>
+                        <p>You can join these files as they currently are using traditional video editors like
+                        OpenShot, Kdenlive, ShotCut, Final Cut Pro or Adobe Premiere. They can re-encode media
+                        files with mixed properties so that they are then matching and able to be joined but
+                        be aware that this can be a time consuming process and almost always results in
+                        degraded video quality.</p>
+                        <p>Re-encoding video is not going to ever be supported by VidCutter because those tools
+                        are already available for you both free and commercially.</p>'''
+            errordialog = ClipErrorsDialog(cliperrors, self)
+            errordialog.setDetailedMessage(detailedmsg)
+            errordialog.show()
+        if len(self.ingest.added):
+            self.showText('media added to index')
 
     def hasExternals(self) -> bool:
         return True in [len(item[3]) > 0 for item in self.clipTimes]
 
     def clipStart(self) -> None:
         starttime = self.delta2QTime(self.seekSlider.value())
-        self.clipTimes.append([starttime, '', self.captureImage(self.currentMedia, starttime), '', None])
+        clip = [starttime, '', self.playerImage(starttime), '', None]
+        self.clipTimes.append(clip)
+        if clip[2] is None:
+            self.requestImages([clip], ThumbnailScheduler.INDEX_PRIORITY)
         self.timeCounter.setMinimum(starttime.toString(self.timeformat))
         self.frameCounter.lockMinimum()
         self.toolbar_start.setDisabled(True)
@@ -1329,8 +1457,38 @@ class VideoCutter(QWidget):
         else:
             return '%f' % (td.days * 86400 + td.seconds + td.microseconds / 1000000.)
 
-    def captureImage(self, source: str, frametime: QTime, external: bool = False) -> QPixmap:
-        return VideoService.captureFrame(self.settings, source, frametime.toString(self.timeformat), external=external)
+    def imageKey(self, source: str, frametime: QTime, external: bool = False) -> str:
+        thumbsize = VideoService.config.thumbnails['INDEX']
+        return '{0}|{1}|{2}x{3}|{4:d}'.format(source, frametime.toString(self.timeformat), thumbsize.width(),
+                                              thumbsize.height(), external)
+
+    def playerImage(self, frametime: QTime) -> Optional[QPixmap]:
+        # the player already holds the frame being marked, only fall back to ffmpeg when it sits elsewhere
+        timer = QElapsedTimer()
+        timer.start()
+        try:
+            position = self.mpvWidget.property('time-pos')
+            fps = self.mpvWidget.property('container-fps') or 25
+        except self.mpvWidget.mpvError:
+            return None
+        if position is None or abs(position - self.qtime2delta(frametime)) > 0.5 / fps:
+            return None
+        image = self.mpvWidget.grabFrame(VideoService.config.thumbnails['INDEX'])
+        if image.isNull():
+            return None
+        image = QPixmap.fromImage(image)
+        self.cacheImage(self.currentMedia, frametime, image)
+        self.logger.info('clip image at {0} taken from the player in {1} ms'
+                         .format(frametime.toString(self.timeformat), timer.elapsed()))
+        return image
+
+    def cachedImage(self, source: str, frametime: QTime, external: bool = False) -> Optional[QPixmap]:
+        return QPixmapCache.find(self.imageKey(source, frametime, external))
+
+    def cacheImage(self, source: str, frametime: QTime, image: QPixmap, external: bool = False) -> None:
+        # every clip image path goes through here so re-adding a clip or reopening a project skips capture
+        if not image.isNull():
+            QPixmapCache.insert(self.imageKey(source, frametime, external), image)
 
     def saveMedia(self) -> None:
         clips = len(self.clipTimes)
@@ -1363,10 +1521,15 @@ class VideoCutter(QWidget):
             steps = 3 if clips > 1 else 2
             self.seekSlider.showProgress(steps)
             self.parent.lock_gui(True)
-            filename, filelist = '', []
+            self.exportTimer.start()
+            if self.directExport and self.currentMedia is not None and not self.hasExternals() \
+                    and not self.keepClips and self.exportDirect(steps):
+                return
+            self.exportMode, self.exportBytes = 'standard', 0
+            filename, filelist, cuts = '', [], []
             for index, clip in enumerate(self.clipTimes):
-                self.seekSlider.updateProgress(index)
                 if len(clip[3]):
+                    self.seekSlider.updateProgress(index)
                     filelist.append(clip[3])
                 else:
                     duration = self.delta2QTime(clip[0].msecsTo(clip[1])).toString(self.timeformat)
@@ -1375,22 +1538,58 @@ class VideoCutter(QWidget):
                         filename = os.path.join(self.workFolder, os.path.basename(filename))
                     filename = QDir.toNativeSeparators(filename)
                     filelist.append(filename)
-                    if not self.videoService.cut(source='{0}{1}'.format(source_file, source_ext),
-                                                 output=filename,
-                                                 frametime=clip[0].toString(self.timeformat),
-                                                 duration=duration,
-                                                 allstreams=True):
-                        self.completeOnError('<p>Failed to cut media file, assuming media is invalid or corrupt. '
-                                             'Attempts are made to work around problematic media files, even '
-                                             'when keyframes are incorrectly set or missing.</p><p>If you feel this '
-                                             'is a bug in the software then please take the time to report it '
-                                             'at our <a href="{}">GitHub Issues page</a> so that it can be fixed.</p>'
-                                             .format(vidcutter.__bugreport__))
-                        return
-            self.joinMedia(filelist)
+                    cuts.append(Munch(index=index, source='{0}{1}'.format(source_file, source_ext), output=filename,
+                                      frametime=clip[0].toString(self.timeformat), duration=duration))
+            self.cutFilelist = filelist
+            self.videoService.checkDiskSpace(os.path.dirname(filelist[0]))
+            self.clipCutter.start(cuts)
+
+    def exportDirect(self, steps: int) -> bool:
+        self.exportMode, self.exportBytes = 'direct', 0
+        chapters = None
+        if self.createChapters:
+            chapters = [clip[4] if clip[4] is not None else 'Chapter {}'.format(index + 1)
+                        for index, clip in enumerate(self.clipTimes)]
+        clips = [(clip[0].msecsSinceStartOfDay() / 1000, clip[1].msecsSinceStartOfDay() / 1000)
+                 for clip in self.clipTimes]
+        result = self.videoService.directExport(self.currentMedia, clips, self.finalFilename, True, chapters)
+        if not result or QFile(self.finalFilename).size() < 1000:
+            result = self.videoService.directExport(self.currentMedia, clips, self.finalFilename, False, chapters)
+        if not result or QFile(self.finalFilename).size() < 1000:
+            self.logger.info('direct export failed, falling back to cutting and joining clips')
+            QFile.remove(self.finalFilename)
+            return False
+        self.exportBytes = QFileInfo(self.finalFilename).size()
+        [self.seekSlider.updateProgress() for _ in range(steps - 1)]
+        self.complete(False, remux=False)
+        return True
+
+    @pyqtSlot(int, bool)
+    def on_clipCut(self, index: int, result: bool) -> None:
+        self.seekSlider.updateProgress(index)
+
+    @pyqtSlot(bool)
+    def on_cutsFinished(self, result: bool) -> None:
+        if not result:
+            self.completeOnError('<p>Failed to cut media file, assuming media is invalid or corrupt. '
+                                 'Attempts are made to work around problematic media files, even '
+                                 'when keyframes are incorrectly set or missing.</p><p>If you feel this '
+                                 'is a bug in the software then please take the time to report it '
+                                 'at our <a href="{}">GitHub Issues page</a> so that it can be fixed.</p>'
+                                 .format(vidcutter.__bugreport__))
+            return
+        self.exportBytes = sum(QFileInfo(filename).size() for index, filename in enumerate(self.cutFilelist)
+                               if not len(self.clipTimes[index][3]))
+        self.joinMedia(self.cutFilelist)
 
     def smartcutter(self, file: str, source_file: str, source_ext: str) -> None:
         self.smartcut_monitor = Munch(clips=[], results=[], externals=0)
+        boundaries = []
+        [
+            boundaries.extend([VideoCutter.qtime2delta(clip[0]), VideoCutter.qtime2delta(clip[1])])
+            for clip in self.clipTimes if not len(clip[3])
+        ]
+        self.videoService.prepareKeyframes('{0}{1}'.format(source_file, source_ext), boundaries)
         for index, clip in enumerate(self.clipTimes):
             if len(clip[3]):
                 self.smartcut_monitor.clips.append(clip[3])
@@ -1440,6 +1639,7 @@ class VideoCutter(QWidget):
             if not rc or QFile(self.finalFilename).size() < 1000:
                 self.logger.info('join resulted in 0 length file, trying again without all stream mapping')
                 self.videoService.join(filelist, self.finalFilename, False, chapters)
+            self.exportBytes += QFileInfo(self.finalFilename).size()
             if not self.keepClips:
                 for f in filelist:
                     clip = self.clipTimes[filelist.index(f)]
@@ -1449,13 +1649,19 @@ class VideoCutter(QWidget):
         else:
             self.complete(True, filelist[-1])
 
-    def complete(self, rename: bool=True, filename: str=None) -> None:
+    def complete(self, rename: bool=True, filename: str=None, remux: bool=True) -> None:
         if rename and filename is not None:
             # noinspection PyCallByClass
             QFile.remove(self.finalFilename)
             # noinspection PyCallByClass
             QFile.rename(filename, self.finalFilename)
-        self.videoService.finalize(self.finalFilename)
+        if remux:
+            self.videoService.finalize(self.finalFilename)
+            self.exportBytes += QFileInfo(self.finalFilename).size()
+        if not self.smartcut:
+            self.logger.info('{0} export: {1} bytes written for a {2} byte file in {3} ms'
+                             .format(self.exportMode, self.exportBytes, QFileInfo(self.finalFilename).size(),
+                                     self.exportTimer.elapsed()))
         self.seekSlider.updateProgress()
         self.toolbar_save.setEnabled(True)
         self.parent.lock_gui(False)
@@ -26,11 +26,12 @@ import logging
 import math
 import sys
 
-from PyQt5.QtCore import QEvent, QObject, QRect, QSettings, QSize, QThread, Qt, pyqtSignal, pyqtSlot
-from PyQt5.QtGui import QColor, QKeyEvent, QMouseEvent, QPaintEvent, QPalette, QPen, QWheelEvent
+from PyQt5.QtCore import QEvent, QObject, QRect, QSize, QTimer, Qt, pyqtSlot
+from PyQt5.QtGui import QColor, QKeyEvent, QMouseEvent, QPaintEvent, QPalette, QPen, QPixmap, QWheelEvent
 from PyQt5.QtWidgets import (qApp, QHBoxLayout, QLabel, QLayout, QProgressBar, QSizePolicy, QSlider, QStyle,
                              QStyleFactory, QStyleOptionSlider, QStylePainter, QWidget)
 
+from vidcutter.libs.thumbnails import ThumbnailScheduler
 from vidcutter.libs.videoservice import VideoService
 
 
@@ -75,6 +76,15 @@ class VideoSlider(QSlider):
         self._cutStarted = False
         self.showThumbs = True
         self.thumbnailsOn = False
+        self.thumbsJob, self.thumbLabels = None, []
+        self.thumbKeys, self.thumbsPending = [], []
+        self.gridMedia, self.gridFrames = None, {}
+        # timeline strips only need the nearest keyframe, clip index images keep frame accurate seeking
+        self.fastThumbs = self.parent.settings.value('fastThumbs', 'on', type=str) in {'on', 'true'}
+        self.thumbsTimer = QTimer(self)
+        self.thumbsTimer.setSingleShot(True)
+        self.thumbsTimer.setInterval(self.parent.settings.value('thumbsDebounce', 300, type=int))
+        self.thumbsTimer.timeout.connect(self.initThumbs)
         self.offset = 8
         self.setOrientation(Qt.Horizontal)
         self.setObjectName('videoslider')
@@ -248,58 +258,87 @@ class VideoSlider(QSlider):
         thumbsize = QSize(
             int(VideoService.config.thumbnails['TIMELINE'].height() * (framesize.width() / framesize.height())),
             int(VideoService.config.thumbnails['TIMELINE'].height()))
-        positions, frametimes = [], []
+        if self.gridMedia != (self.parent.currentMedia, thumbsize):
+            self.gridMedia, self.gridFrames = (self.parent.currentMedia, thumbsize), {}
         thumbs = int(math.ceil((self.rect().width() - (self.offset * 2)) / thumbsize.width()))
+        # snap every slot to a power-of-two subdivision of the duration; coarser levels are subsets of finer ones
+        # so frames captured for one strip width are reused by any other
+        level = int(math.ceil(math.log2(max(thumbs, 1))))
+        self.thumbKeys = []
         for pos in range(thumbs):
             val = QStyle.sliderValueFromPosition(self.minimum(), self.maximum(),
                                                  (thumbsize.width() * pos) - self.offset,
                                                  self.rect().width() - (self.offset * 2))
-            positions.append(val)
-        positions[0] = 1000
-        [frametimes.append(self.parent.delta2QTime(msec).toString(self.parent.timeformat)) for msec in positions]
-
-        class ThumbWorker(QObject):
-            completed = pyqtSignal(list)
-
-            def __init__(self, settings: QSettings, media: str, times: list, size: QSize):
-                super(ThumbWorker, self).__init__()
-                self.settings = settings
-                self.media = media
-                self.times = times
-                self.size = size
-
-            @pyqtSlot()
-            def generate(self):
-                frames = list()
-                [
-                    frames.append(VideoService.captureFrame(self.settings, self.media, frame, self.size))
-                    for frame in self.times
-                ]
-                self.completed.emit(frames)
-
-        self.thumbsThread = QThread(self)
-        self.thumbsWorker = ThumbWorker(self.parent.settings, self.parent.currentMedia, frametimes, thumbsize)
-        self.thumbsWorker.moveToThread(self.thumbsThread)
-        self.thumbsThread.started.connect(self.parent.sliderWidget.setLoader)
-        self.thumbsThread.started.connect(self.thumbsWorker.generate)
-        self.thumbsThread.finished.connect(self.thumbsThread.deleteLater, Qt.DirectConnection)
-        self.thumbsWorker.completed.connect(self.buildTimeline)
-        self.thumbsWorker.completed.connect(self.thumbsWorker.deleteLater, Qt.DirectConnection)
-        self.thumbsWorker.completed.connect(self.thumbsThread.quit, Qt.DirectConnection)
-        self.thumbsThread.start()
-
-    @pyqtSlot(list)
-    def buildTimeline(self, thumbs: list) -> None:
+            cell = round((val - self.minimum()) / max(self.maximum() - self.minimum(), 1) * (1 << level))
+            self.thumbKeys.append(self.gridKey(min(cell, (1 << level) - 1), level))
+        self.cancelThumbs()
+        # lay the strip out straight away and fill it in frame by frame, starting around the playhead
+        self.buildTimeline(len(self.thumbKeys), thumbsize)
+        for slot, key in enumerate(self.thumbKeys):
+            if key in self.gridFrames:
+                self.thumbLabels[slot].setPixmap(self.gridFrames[key])
+        self.thumbsPending = sorted(set(key for key in self.thumbKeys if key not in self.gridFrames),
+                                    key=lambda k: k[0] / (1 << k[1]))
+        if not len(self.thumbsPending):
+            self.thumbsJob = None
+            return
+        frametimes = [self.parent.delta2QTime(self.gridTime(key)).toString(self.parent.timeformat)
+                      for key in self.thumbsPending]
+        focus = QStyle.sliderPositionFromValue(self.minimum(), self.maximum(), self.value(),
+                                               self.rect().width() - (self.offset * 2)) // thumbsize.width()
+        focuskey = self.thumbKeys[min(max(focus, 0), len(self.thumbKeys) - 1)]
+        focus = min(range(len(self.thumbsPending)),
+                    key=lambda i: abs(self.gridTime(self.thumbsPending[i]) - self.gridTime(focuskey)))
+        self.thumbsJob = self.parent.thumbnailer.submit(self.parent.currentMedia, frametimes, thumbsize,
+                                                        ThumbnailScheduler.TIMELINE_PRIORITY,
+                                                        batched=True, focus=focus, fast=self.fastThumbs)
+
+    def cancelThumbs(self) -> None:
+        # stale strips never render, and their ffmpeg processes are killed rather than left to finish
+        self.thumbsTimer.stop()
+        if self.thumbsJob is not None:
+            self.parent.thumbnailer.cancel(self.thumbsJob)
+            self.thumbsJob = None
+
+    def scheduleThumbs(self) -> None:
+        self.cancelThumbs()
+        self.thumbsTimer.start()
+
+    @staticmethod
+    def gridKey(cell: int, level: int) -> tuple:
+        while level > 0 and cell % 2 == 0:
+            cell, level = cell // 2, level - 1
+        return cell, level
+
+    def gridTime(self, key: tuple) -> int:
+        cell, level = key
+        # the very first frame is often black so start the strip a second in, as before
+        return max(self.minimum() + round((self.maximum() - self.minimum()) * cell / (1 << level)), 1000)
+
+    @pyqtSlot(int, int, QPixmap)
+    def on_thumbReady(self, job: int, slot: int, thumb: QPixmap) -> None:
+        if job == self.thumbsJob:
+            key = self.thumbsPending[slot]
+            self.gridFrames[key] = thumb
+            [self.thumbLabels[pos].setPixmap(thumb) for pos, k in enumerate(self.thumbKeys) if k == key]
+
+    @pyqtSlot(int)
+    def on_thumbsFinished(self, job: int) -> None:
+        if job == self.thumbsJob:
+            self.thumbsJob = None
+
+    def buildTimeline(self, count: int, thumbsize: QSize) -> None:
         thumbslayout = QHBoxLayout()
         thumbslayout.setSizeConstraint(QLayout.SetFixedSize)
         thumbslayout.setSpacing(0)
         thumbslayout.setContentsMargins(0, 16, 0, 0)
-        for thumb in thumbs:
+        self.thumbLabels = []
+        for _ in range(count):
             thumblabel = QLabel()
             thumblabel.setStyleSheet('padding: 0; margin: 0;')
-            thumblabel.setFixedSize(thumb.size())
-            thumblabel.setPixmap(thumb)
+            thumblabel.setFixedSize(thumbsize)
             thumbslayout.addWidget(thumblabel)
+            self.thumbLabels.append(thumblabel)
         thumbnails = QWidget(self)
         thumbnails.setLayout(thumbslayout)
         filmlabel = QLabel()
@@ -352,9 +391,8 @@ class VideoSlider(QSlider):
     @pyqtSlot()
     def on_rangeChanged(self) -> None:
         if self.parent.thumbnailsButton.isChecked():
-            self.parent.sliderWidget.setLoader(True)
             self.parent.sliderWidget.hideThumbs()
-            self.initThumbs()
+            self.scheduleThumbs()
         else:
             self.parent.sliderWidget.setLoader(False)
 